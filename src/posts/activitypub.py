@@ -1,7 +1,7 @@
 # https://prisma-client-py.readthedocs.io/en/stable/
 
 import os
-import yaml
+import sys
 import json
 import flask
 
@@ -9,6 +9,10 @@ from typing import Union
 from flask import Response
 from waitress import serve
 
+# Shares The Parsed Config With The Congress Scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usa", "federal", "congress", "api"))
+from config import load_config
+
 
 hostName = "localhost"
 serverPort = 8080
@@ -23,13 +27,9 @@ headers: dict = {
 	"Signature": 'keyId="%s/actor#main-key",headers="(request-target) host date",signature="..."' % web_domain
 }
 
-def load_config():
-	with open(file=os.path.join("data", "config.yml"), mode='r') as fi:
-		return yaml.safe_load(fi)
-
 def get_config():
 	config = load_config()
-	activitypub = config['activitypub']
+	activitypub = config.get_activitypub()
 	
 	return config, activitypub
 
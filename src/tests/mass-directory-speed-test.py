@@ -1,4 +1,8 @@
-import os, time, glob, humanize, datetime
+import os, sys, time, glob, humanize, datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usa", "federal", "congress", "api"))
+from walker import walk as parallel_walk
+from shards import load_archive
 
 
 def scantree(path: str = os.path.join("data", "local"), n: int = 0) -> int:
@@ -53,6 +57,30 @@ def walk() -> None:
     t: float = time.time() - t
     print("os.walk: %s, %s files found\n" % (humanize.naturaldelta(datetime.timedelta(seconds=t)), humanize.intcomma(n)))
 
+def walker(workers: int) -> None:
+    n: int = 0
+    t: float = time.time()
+    for _ in parallel_walk(path=os.path.join("data", "local"), suffix=".json", workers=workers):
+        n += 1
+
+    t: float = time.time() - t
+    print("walker.walk (%s workers): %s, %s files found\n" % (workers, humanize.naturaldelta(datetime.timedelta(seconds=t)), humanize.intcomma(n)))
+
+def packed() -> None:
+    archive = load_archive()
+    if archive is None:
+        print("No Shard Archive, Run shards.py import First\n")
+        return
+
+    n: int = 0
+    t: float = time.time()
+    for record in archive.records(suffix=".json"):
+        archive.read(record=record)
+        n += 1
+
+    t: float = time.time() - t
+    print("shards.records + read: %s, %s files found\n" % (humanize.naturaldelta(datetime.timedelta(seconds=t)), humanize.intcomma(n)))
+
 if __name__ == "__main__":
     if not os.path.exists(os.path.join("data", "local")):
         os.makedirs(os.path.join("data", "local"))
@@ -67,4 +95,12 @@ if __name__ == "__main__":
     listdir()
 
     print("Testing glob.iglob...")
-    iglob()
\ No newline at end of file
+    iglob()
+
+    print("Testing walker.walk...")
+    walker(workers=1)
+    walker(workers=8)
+    walker(workers=32)
+
+    print("Testing shards.records...")
+    packed()
\ No newline at end of file
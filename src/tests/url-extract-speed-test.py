@@ -0,0 +1,75 @@
+import os, sys, json, time, dpath, humanize, datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "usa", "federal", "congress", "api"))
+from walker import walk
+from extract import iter_urls, scan_urls
+
+
+def load_corpus(limit: int) -> list[bytes]:
+    corpus: list[bytes] = []
+    for entry in walk(path=os.path.join("data", "local"), suffix=".json"):
+        with open(entry.path, mode="rb") as f:
+            corpus.append(f.read())
+
+        if len(corpus) >= limit:
+            break
+
+    return corpus
+
+def dpath_search(corpus: list[bytes]) -> list[list[str]]:
+    n: int = 0
+    found: list[list[str]] = []
+    t: float = time.time()
+    for raw in corpus:
+        urls: list[str] = [value for (_, value) in dpath.search(json.loads(raw), '**/url', yielded=True) if type(value) is str]
+        n += len(urls)
+        found.append(urls)
+
+    t: float = time.time() - t
+    print("json.loads + dpath.search: %s, %s urls found\n" % (humanize.precisedelta(datetime.timedelta(seconds=t), minimum_unit="milliseconds"), humanize.intcomma(n)))
+    return found
+
+def iterative(corpus: list[bytes]) -> list[list[str]]:
+    n: int = 0
+    found: list[list[str]] = []
+    t: float = time.time()
+    for raw in corpus:
+        urls: list[str] = list(iter_urls(data=json.loads(raw)))
+        n += len(urls)
+        found.append(urls)
+
+    t: float = time.time() - t
+    print("json.loads + extract.iter_urls: %s, %s urls found\n" % (humanize.precisedelta(datetime.timedelta(seconds=t), minimum_unit="milliseconds"), humanize.intcomma(n)))
+    return found
+
+def raw_scan(corpus: list[bytes]) -> list[list[str]]:
+    n: int = 0
+    found: list[list[str]] = []
+    t: float = time.time()
+    for raw in corpus:
+        urls: list[str] = list(scan_urls(raw=raw))
+        n += len(urls)
+        found.append(urls)
+
+    t: float = time.time() - t
+    print("extract.scan_urls (no parse): %s, %s urls found\n" % (humanize.precisedelta(datetime.timedelta(seconds=t), minimum_unit="milliseconds"), humanize.intcomma(n)))
+    return found
+
+if __name__ == "__main__":
+    if not os.path.exists(os.path.join("data", "local")):
+        os.makedirs(os.path.join("data", "local"))
+
+    limit: int = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    corpus: list[bytes] = load_corpus(limit=limit)
+    print("Loaded %s Files (%s)\n" % (humanize.intcomma(len(corpus)), humanize.naturalsize(sum(len(raw) for raw in corpus))))
+
+    print("Testing dpath.search...")
+    expected: list[list[str]] = dpath_search(corpus=corpus)
+
+    print("Testing extract.iter_urls...")
+    if iterative(corpus=corpus) != expected:
+        print("extract.iter_urls Returned Different URLs Than dpath.search\n")
+
+    print("Testing extract.scan_urls...")
+    if raw_scan(corpus=corpus) != expected:
+        print("extract.scan_urls Returned Different URLs Than dpath.search\n")
@@ -0,0 +1,161 @@
+import math
+import queue
+import threading
+
+from enum import Enum
+from manifest import LocalHash, hash_file, load_manifest
+from typing import Union, Optional, Generator, NamedTuple
+from mypy_boto3_s3 import S3Client  # This exists purely for strong typing boto3
+
+
+class BucketObject(NamedTuple):
+    key: str
+    size: int
+    etag: str  # Without The Quotes S3 Wraps It In
+    last_modified: float
+
+class SyncState(Enum):
+    MISSING_FROM_BUCKET = "missing_from_bucket"
+    MISSING_FROM_LOCAL = "missing_from_local"
+    DIFFERING = "differing"
+    IDENTICAL = "identical"
+
+def compare(local: Optional[LocalHash], remote: Optional[BucketObject], path: Optional[str] = None) -> SyncState:
+    """
+        Compare A Local File With Its Object By Size And ETag
+
+        A single-part ETag is the object's md5. A multipart one is checked against the
+        8 MiB part ETag cached in the manifest. If the object was uploaded with a different
+        part size, the file at path is hashed with the part size its ETag implies, and that
+        ETag is cached in the manifest too so an unchanged file is only read once.
+    """
+    if local is None:
+        return SyncState.MISSING_FROM_LOCAL
+
+    if remote is None:
+        return SyncState.MISSING_FROM_BUCKET
+
+    if local.size != remote.size:
+        return SyncState.DIFFERING
+
+    if "-" not in remote.etag:
+        return SyncState.IDENTICAL if remote.etag == local.hash else SyncState.DIFFERING
+
+    if remote.etag == local.part_etag:
+        return SyncState.IDENTICAL
+
+    # Uploaders Use Whole MiB Part Sizes, So The Part Count Pins Down Which One Was Used
+    parts: int = int(remote.etag.split("-")[-1])
+    part_size: int = math.ceil(local.size / parts / (1024*1024)) * 1024*1024
+    if local.other_part_size == part_size and local.other_part_etag is not None:
+        return SyncState.IDENTICAL if remote.etag == local.other_part_etag else SyncState.DIFFERING
+
+    if path is None:
+        return SyncState.DIFFERING
+
+    _, part_etag = hash_file(path=path, part_size=part_size)
+    if part_etag is not None:
+        load_manifest().record_part_etag(key=remote.key, local=local, part_size=part_size, part_etag=part_etag)
+
+    return SyncState.IDENTICAL if remote.etag == part_etag else SyncState.DIFFERING
+
+def is_local_newer(local: LocalHash, remote: BucketObject) -> bool:
+    return local.mtime > remote.last_modified
+
+def to_bucket_object(item: dict) -> BucketObject:
+    return BucketObject(key=item["Key"], size=item["Size"], etag=item["ETag"].strip('"'), last_modified=item["LastModified"].timestamp())
+
+def discover_prefixes(s3: S3Client, bucket: str, prefix: str = "usa/federal/", depth: int = 3) -> tuple[list[str], list[BucketObject]]:
+    """
+        Split The Keyspace Under prefix Into Shards By Walking "Folders" With Delimiter="/"
+
+        With the default depth, usa/federal/ becomes one shard per congress and type
+        (e.g. usa/federal/congress/bills/117/). Objects sitting directly in a folder
+        above that depth are returned separately, since no shard will list them.
+    """
+    shards: list[str] = [prefix]
+    objects: list[BucketObject] = []
+    paginator = s3.get_paginator('list_objects_v2')
+
+    for _ in range(depth):
+        children: list[str] = []
+        for shard in shards:
+            found: list[str] = []
+            for page in paginator.paginate(Bucket=bucket, Prefix=shard, Delimiter="/"):
+                found.extend(common["Prefix"] for common in page.get("CommonPrefixes", []))
+                objects.extend(to_bucket_object(item=item) for item in page.get("Contents", []))
+
+            # A Folder Without Subfolders Was Fully Listed Just Now
+            children.extend(found)
+
+        shards = children
+        if len(shards) == 0:
+            break
+
+    return shards, objects
+
+def list_shard(s3: S3Client, bucket: str, prefix: str) -> Generator[list[BucketObject], None, None]:
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={"PageSize": 1000}):
+        yield [to_bucket_object(item=item) for item in page.get("Contents", [])]
+
+def list_bucket(s3: S3Client, bucket: str, prefix: str = "usa/federal/", workers: int = 16, depth: int = 3) -> Generator[BucketObject, None, None]:
+    """
+        Every Object Under prefix, Listed A Shard At A Time On workers Threads
+
+        Pages are handed over as they arrive, so the caller can diff while listing goes on.
+        Order across shards isn't defined.
+    """
+    shards, objects = discover_prefixes(s3=s3, bucket=bucket, prefix=prefix, depth=depth)
+    yield from objects
+
+    pending: queue.Queue = queue.Queue()
+    for shard in shards:
+        pending.put(shard)
+
+    results: queue.Queue = queue.Queue(maxsize=workers*4)
+    stopped: threading.Event = threading.Event()
+
+    def worker() -> None:
+        try:
+            while not stopped.is_set():
+                try:
+                    shard: str = pending.get_nowait()
+                except queue.Empty:
+                    break
+
+                for page in list_shard(s3=s3, bucket=bucket, prefix=shard):
+                    if stopped.is_set():
+                        break
+
+                    results.put(page)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(None)
+
+    threads: list[threading.Thread] = [threading.Thread(target=worker, daemon=True) for _ in range(min(workers, max(len(shards), 1)))]
+    for thread in threads:
+        thread.start()
+
+    finished: int = 0
+    try:
+        while finished < len(threads):
+            page: Optional[Union[list[BucketObject], Exception]] = results.get()
+            if page is None:
+                finished += 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        # Caller Stopped Early (Or A Shard Failed), Unblock Workers Waiting On A Full Queue
+        stopped.set()
+        while any(thread.is_alive() for thread in threads):
+            try:
+                results.get_nowait()
+            except queue.Empty:
+                pass
+
+            for thread in threads:
+                thread.join(timeout=0.01)
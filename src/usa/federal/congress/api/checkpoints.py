@@ -0,0 +1,137 @@
+import os
+import json
+import datetime
+import tempfile
+import threading
+
+from typing import Optional
+
+
+class Checkpoints:
+    """
+        Durable Pagination Progress For Each List Endpoint
+
+        A page only counts as done once every detail URL queued from it has finished,
+        so a crash never skips items that were queued but not yet downloaded.
+    """
+    path: str
+    page_size: int
+    state: dict  # Name -> {"offset": int, "count": int, "updated": str}
+    pending: dict  # Name -> {Page Offset: Unfinished Jobs}
+    finished: dict  # Name -> Set Of Finished Page Offsets Past The Saved Offset
+    ended: set  # Names That Won't Have Any More Pages Started
+    lock: threading.RLock
+
+    def __init__(self, path: str = os.path.join("data", "checkpoints.json"), page_size: int = 250) -> None:
+        self.path = path
+        self.page_size = page_size
+        self.state = {}
+        self.pending = {}
+        self.finished = {}
+        self.ended = set()
+        self.lock = threading.RLock()
+
+        if os.path.exists(path):
+            with open(path, 'r') as fi:
+                self.state = json.load(fi)
+
+    def save(self) -> None:
+        """
+            Write To A Temporary File, Then Rename Over The Old One
+        """
+        directory: str = os.path.dirname(self.path) or "."
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self.lock:
+            fd, temp = tempfile.mkstemp(dir=directory, prefix=".checkpoints-", suffix=".json")
+            with os.fdopen(fd, 'w') as fo:
+                json.dump(self.state, fo, indent=4)
+                fo.flush()
+                os.fsync(fo.fileno())
+
+            os.replace(temp, self.path)
+
+    def get_offset(self, name: str) -> int:
+        with self.lock:
+            return self.state.get(name, {}).get("offset", 0)
+
+    def begin_page(self, name: str, offset: int, count: int, jobs: int) -> None:
+        with self.lock:
+            if name not in self.state:
+                self.state[name] = {"offset": offset, "count": count, "updated": None}
+
+            self.state[name]["count"] = count
+            self.pending.setdefault(name, {})[offset] = jobs
+            self.ended.discard(name)
+
+            if jobs == 0:
+                self.finish_page(name=name, offset=offset)
+
+    def finish_item(self, name: str, offset: int) -> None:
+        with self.lock:
+            self.pending[name][offset] -= 1
+            if self.pending[name][offset] == 0:
+                self.finish_page(name=name, offset=offset)
+
+    def finish_page(self, name: str, offset: int) -> None:
+        with self.lock:
+            del self.pending[name][offset]
+            if name not in self.state:
+                return
+
+            self.finished.setdefault(name, set()).add(offset)
+
+            # Pages Can Finish Out Of Order, Only Move Past The Ones With Nothing Unfinished Before Them
+            checkpoint: dict = self.state[name]
+            moved: bool = False
+            while checkpoint["offset"] in self.finished[name]:
+                self.finished[name].remove(checkpoint["offset"])
+                checkpoint["offset"] += self.page_size
+                moved = True
+
+            if moved:
+                checkpoint["updated"] = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+                self.end_if_done(name=name)
+                self.save()
+
+    def end(self, name: str) -> None:
+        """
+            No More Pages Will Be Started, Forget The Checkpoint Once The Queued Ones Finish
+        """
+        with self.lock:
+            self.ended.add(name)
+            self.end_if_done(name=name)
+            self.save()
+
+    def end_if_done(self, name: str) -> None:
+        with self.lock:
+            if name not in self.state:
+                return
+
+            complete: bool = self.state[name]["offset"] >= self.state[name]["count"]
+            idle: bool = name in self.ended and len(self.pending.get(name, {})) == 0
+            if complete or idle:
+                # Finished Endpoints Start Over From The Beginning On The Next Run
+                del self.state[name]
+
+    def reset(self, names: Optional[list[str]] = None) -> None:
+        with self.lock:
+            if names is None or len(names) == 0:
+                self.state = {}
+            else:
+                for name in names:
+                    self.state.pop(name, None)
+
+            self.save()
+
+checkpoints: Optional[Checkpoints] = None
+checkpoints_lock: threading.Lock = threading.Lock()
+def load_checkpoints() -> Checkpoints:
+    global checkpoints
+
+    with checkpoints_lock:
+        if checkpoints is None:
+            checkpoints = Checkpoints()
+
+        return checkpoints
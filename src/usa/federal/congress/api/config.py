@@ -0,0 +1,116 @@
+import os
+import yaml
+import boto3
+import threading
+
+from retry import RetryPolicy
+from storage import compressions
+from typing import Optional
+from botocore.config import Config as BotoConfig
+from mypy_boto3_s3 import S3Client  # This exists purely for strong typing boto3
+
+
+class Config:
+    """
+        data/config.yml, Parsed Once And Shared By Every Script
+    """
+    path: str
+    config: dict
+    lock: threading.Lock
+    s3_client: Optional[S3Client]
+
+    def __init__(self, path: str = os.path.join("data", "config.yml")) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.s3_client = None
+
+        with open(path, 'r') as fi:
+            self.config = yaml.safe_load(fi) or {}
+
+    def get_section(self, section: str, required: tuple = ()) -> dict:
+        if section not in self.config:
+            raise KeyError('Missing %s Section From Config' % section)
+
+        for key in required:
+            if key not in self.config[section]:
+                raise KeyError('Missing %s Section From Config["%s"]' % (key, section))
+
+        return self.config[section]
+
+    def get_s3_client(self) -> S3Client:
+        """
+            Long-Lived S3 Client, boto3 Clients Are Safe To Share Between Threads
+        """
+        with self.lock:
+            if self.s3_client is not None:
+                return self.s3_client
+
+            config: dict = self.get_section(section="s3", required=("access_key_id", "secret_access_key", "endpoint"))
+
+            # Enough Pooled Connections For Every Download Worker To Upload At Once
+            pool: int = int(config.get("max_pool_connections", max(self.get_concurrency(), 10)))
+            self.s3_client = boto3.client(
+                service_name='s3',
+                aws_access_key_id=config['access_key_id'],
+                aws_secret_access_key=config['secret_access_key'],
+                endpoint_url=config['endpoint'],
+                config=BotoConfig(max_pool_connections=pool, retries={"max_attempts": 5, "mode": "standard"})
+            )
+
+            return self.s3_client
+
+    def get_default_s3_bucket(self) -> str:
+        return self.get_section(section="s3", required=("default_bucket",))["default_bucket"]
+
+    def get_api_keys(self) -> list[str]:
+        return self.get_section(section="congress", required=("keys",))["keys"]
+
+    def get_hourly_limit(self) -> int:
+        # https://api.congress.gov/ - 5,000 Requests Per Hour Per Key
+        return int(self.get_section(section="congress").get("hourly_limit", 5000))
+
+    def get_concurrency(self) -> int:
+        # Optional, Defaults To A Conservative Number Of Simultaneous Downloads
+        return int(self.config.get("congress", {}).get("concurrency", 8))
+
+    def get_page_concurrency(self) -> int:
+        # Optional, List Pages Fetched At Once For Each Endpoint
+        return int(self.config.get("congress", {}).get("page_concurrency", 4))
+
+    def get_parse_workers(self) -> int:
+        # Optional, Defaults To One JSON Parsing Process Per Core
+        return int(self.config.get("congress", {}).get("parse_workers", os.cpu_count() or 1))
+
+    def get_retry_policy(self) -> RetryPolicy:
+        # Optional, How Often And How Long To Back Off Before Giving Up On A URL
+        retry: dict = self.config.get("congress", {}).get("retry", {})
+        return RetryPolicy(max_attempts=int(retry.get("max_attempts", 5)), base_delay=float(retry.get("base_delay", 2.0)), max_delay=float(retry.get("max_delay", 300.0)))
+
+    def get_compression(self) -> str:
+        # Optional, How JSON Is Stored In data/local And The Bucket (none, gzip Or zstd)
+        compression: str = str(self.config.get("storage", {}).get("compression", "none")).lower()
+        if compression not in compressions:
+            raise KeyError('Unknown Compression "%s" In Config["storage"], Expected One Of %s' % (compression, ", ".join(compressions)))
+
+        return compression
+
+    def get_compression_level(self) -> Optional[int]:
+        level: Optional[int] = self.config.get("storage", {}).get("level")
+        return None if level is None else int(level)
+
+    def get_database(self) -> str:
+        return self.get_section(section="database", required=("url",))["url"]
+
+    def get_activitypub(self) -> dict:
+        return self.get_section(section="activitypub")
+
+config: Optional[Config] = None
+config_lock: threading.Lock = threading.Lock()
+def load_config() -> Config:
+    global config
+
+    with config_lock:
+        if config is None:
+            config = Config()
+
+        return config
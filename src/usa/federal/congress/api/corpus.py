@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+
+from manifest import load_manifest
+from storage import decompress
+from shards import ShardArchive, ShardRecord, load_archive
+from typing import Any, Union, Optional, Generator, NamedTuple
+
+try:
+    import orjson  # Optional, Parses Straight From A memoryview Several Times Faster Than json
+except ImportError:
+    orjson = None
+
+
+class CorpusEntry(NamedTuple):
+    path: str  # data/local/<key>, Even When The Document Lives In A Shard
+    record: Optional[ShardRecord] = None  # Set When It's Read From The Shard Archive
+
+def parse(data: Union[bytes,bytearray,memoryview]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+
+    # json Won't Take A memoryview
+    return json.loads(data if type(data) is not memoryview else bytes(data))
+
+class CorpusReader:
+    """
+        Shared Reader For Scans Over The Whole Local Corpus
+
+        Files are read with readinto() into one buffer that's reused from file to file,
+        shard records are handed out as views straight into the segment's mmap. Either way
+        the memoryview returned by read() is only valid until the next read(), so parse it
+        (or copy it) before moving on. Not thread-safe, load_reader() gives each thread its own.
+    """
+    root: str
+    buffer: bytearray
+    archive: Optional[ShardArchive]
+
+    def __init__(self, root: str = os.path.join("data", "local"), buffer_size: int = 1024*1024) -> None:
+        self.root = root
+        self.buffer = bytearray(buffer_size)
+        self.archive = load_archive()
+
+    def entries(self, suffix: str = ".json") -> Generator[CorpusEntry, None, None]:
+        """
+            Packed Documents First (In Segment Order), Then Anything Downloaded Since The Last Pack
+
+            A key saved again after it was packed is read from disk, the stale packed copy is skipped.
+        """
+        # Files Written Outside The Downloader Are Picked Up Before Listing
+        load_manifest().reconcile(root=self.root)
+
+        if self.archive is None:
+            for path in load_manifest().paths(suffix=suffix, root=self.root):
+                yield CorpusEntry(path=path)
+
+            return
+
+        # Committed First, The Archive Reads The Manifest Through Its Own Connection
+        load_manifest().commit()
+        for record in self.archive.records(suffix=suffix, manifest=load_manifest().path):
+            yield CorpusEntry(path=os.path.join(self.root, record.key), record=record)
+
+        for path in load_manifest().paths(suffix=suffix, root=self.root, exclude=os.path.join(self.archive.root, "index.db")):
+            yield CorpusEntry(path=path)
+
+    def read_into(self, file: str) -> memoryview:
+        with open(file, mode="rb", buffering=0) as f:
+            size: int = os.fstat(f.fileno()).st_size
+            if size > len(self.buffer):
+                # Grow Geometrically So A Run Of Slightly Bigger Files Doesn't Reallocate Every Time
+                self.buffer = bytearray(max(size, len(self.buffer)*2))
+
+            view: memoryview = memoryview(self.buffer)
+            read: int = 0
+            while read < size:
+                n: int = f.readinto(view[read:size])
+                if n == 0:
+                    break  # Truncated While Reading
+
+                read += n
+
+        return view[:read]
+
+    def read(self, entry: Union[str,CorpusEntry]) -> Union[bytes,memoryview]:
+        if type(entry) is str:
+            entry = CorpusEntry(path=entry)
+
+        if entry.record is not None:
+            if self.archive is None:
+                self.archive = load_archive()
+
+            data: Union[bytes,memoryview] = self.archive.read(record=entry.record) # type: ignore
+        else:
+            data: Union[bytes,memoryview] = self.read_into(file=entry.path)
+
+        # Compressed Documents Have To Be Copied Out Anyway, Plain Ones Stay Zero-Copy
+        return decompress(data=data) # type: ignore
+
+    def load(self, entry: Union[str,CorpusEntry]) -> Any:
+        return parse(data=self.read(entry=entry))
+
+    def documents(self, suffix: str = ".json") -> Generator[tuple[str, Any], None, None]:
+        for entry in self.entries(suffix=suffix):
+            try:
+                document: Any = self.load(entry=entry)
+            except FileNotFoundError:
+                if entry.record is not None:
+                    raise
+
+                # Deleted Since The Manifest Last Saw It, Skipped Like A Walk Of The Disk Would
+                continue
+
+            yield entry.path, document
+
+readers: threading.local = threading.local()
+def load_reader() -> CorpusReader:
+    if not hasattr(readers, "reader"):
+        readers.reader = CorpusReader()
+
+    return readers.reader
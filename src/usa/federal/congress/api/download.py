@@ -1,23 +1,37 @@
 import os
 import re
-import csv
 import sys
 import json
 import time
-import yaml
-import boto3
-import dpath
+import hashlib
+import tempfile
 import signal
+import argparse
+import asyncio
+import threading
+import multiprocessing
 import datetime
 import humanize
 import requests
 
 from typing import Union
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from requests.adapters import HTTPAdapter
+from config import load_config
+from manifest import load_manifest, FileVersion
+from checkpoints import load_checkpoints
+from errorlog import load_error_log
+from paginators import Paginator, OffsetPaginator, CongressionalRecordPaginator
+from ratelimit import KeyScheduler
+from retry import Failure, DownloadError, RetryPolicy, classify_status, classify_exception, load_retry_queue
+from storage import compress
+from corpus import CorpusEntry, load_reader
+from extract import iter_urls, scan_urls
 from io import BufferedWriter, TextIOWrapper
 from re import Pattern, Match
 from requests import Response
 from mypy_boto3_s3 import S3Client  # This exists purely for strong typing boto3
-from typing import Generator, Optional
+from typing import Optional, NamedTuple
 from urllib.parse import urlparse, ParseResult
 
 
@@ -47,9 +61,19 @@ skipped: list = [
     # "api.congress.gov"  # JSON
 ]
 
-def upload_file(key: str, body: Union[str,bytes]) -> None:
-    s3: S3Client = get_s3_client()
-    bucket: str = get_default_s3_bucket()
+def upload_file(key: str, body: Union[str,bytes], content_encoding: Optional[str] = None) -> None:
+    s3: S3Client = load_config().get_s3_client()
+    bucket: str = load_config().get_default_s3_bucket()
+
+    if content_encoding is not None:
+        s3.put_object(
+            Bucket=bucket,
+            Body=body,
+            Key=key,
+            ContentType="application/json",
+            ContentEncoding=content_encoding
+        )
+        return
 
     s3.put_object(
         Bucket=bucket,
@@ -58,21 +82,31 @@ def upload_file(key: str, body: Union[str,bytes]) -> None:
     )
 
 # TODO: Figure out if I should optimize this and how to do it
-def save_local(key: str, body: Union[str,bytes]) -> None: # type: ignore
-    key: str = os.path.join("data", "local", key)
-    path: str = os.path.dirname(key)
+def save_local(key: str, body: Union[str,bytes], content_type: Optional[str] = None, url: Optional[str] = None) -> None:
+    file: str = os.path.join("data", "local", key)
+    path: str = os.path.dirname(file)
     if not os.path.exists(path):
         os.makedirs(path)
     
     if type(body) is str:
-        text_file: TextIOWrapper = open(key, 'w')
+        text_file: TextIOWrapper = open(file, 'w')
         text_file.write(body)
         text_file.close()
     elif type(body) is bytes:
-        binary_file: BufferedWriter = open(key, 'wb')
+        binary_file: BufferedWriter = open(file, 'wb')
         binary_file.write(body)
         binary_file.close()
 
+    load_manifest().record(key=key, body=body, content_type=content_type, url=url, mtime=os.path.getmtime(file))
+
+def save_json(key: str, body: Union[str,bytes], content_type: Optional[str] = None, url: Optional[str] = None) -> None:
+    """
+        Save A JSON Document Locally And To S3, Compressed Once If storage.compression Is Set
+    """
+    stored, content_encoding = compress(data=body, compression=load_config().get_compression(), level=load_config().get_compression_level())
+    save_local(key=key, body=stored, content_type=content_type, url=url)
+    upload_file(key=key, body=stored, content_encoding=content_encoding)
+
 def get_key(url: str) -> str:
     path: str = urlparse(url).path
     split: list[str] = path.split("/")[2:]
@@ -83,31 +117,9 @@ def get_key(url: str) -> str:
     
     return "usa/federal/congress/%s/data.json" % "/".join(split)
 
-def log_error(url: str, message: str) -> None:
-    # TODO: Determine if we need to optimize writing to this file
-    with open(os.path.join("data", "errors.csv"), 'a') as fi:
-        row = csv.writer(fi)
-        row.writerow([url, message])
-
-def get_api_key() -> Generator[str, None, None]:
-    with open(os.path.join("data", "config.yml"), 'r') as fi:
-        config: dict = yaml.safe_load(fi)
-
-    if "congress" not in config:
-        raise KeyError('Missing Congress Section From Config')
-    elif "keys" not in config["congress"]:
-        raise KeyError('Missing Keys Section From Config["congress"]')
-
-    config = config["congress"]
-    total: int = len(config["keys"])
-    current = 0
-    while True:
-        yield config["keys"][current]
-        
-        if current >= total-1:
-            current = 0
-        else:
-            current += 1
+def log_error(url: str, message: str, status: Optional[int] = None, key: Optional[str] = None, attempt: Optional[int] = None) -> None:
+    # Buffered, Rows Are Written To data/errors.csv In Batches
+    load_error_log().log(url=url, message=message, status=status, key=key, attempt=attempt)
 
 letters_numbers_regex: Pattern[str] = re.compile(r"([a-zA-Z]*)([0-9]*)")
 def split_on_letters_numbers(text: str) -> Optional[Match[str]]:
@@ -116,35 +128,144 @@ def split_on_letters_numbers(text: str) -> Optional[Match[str]]:
     match: Optional[Match[str]] = re.match(pattern=letters_numbers_regex, string=text)
     return match
 
+def stream_file(key: str, response: Response, url: str, part_size: int = 8*1024*1024) -> None:
+    """
+        Tee A Response Body To data/local And S3 Without Holding More Than One Part In Memory
+    """
+    s3: S3Client = load_config().get_s3_client()
+    bucket: str = load_config().get_default_s3_bucket()
+    content_type: str = response.headers.get('content-type', "application/octet-stream")
+
+    file: str = os.path.join("data", "local", key)
+    path: str = os.path.dirname(file)
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    size: int = 0
+    digest = hashlib.md5()
+    buffer: bytearray = bytearray()
+    parts: list[dict] = []
+    upload_id: Optional[str] = None
+
+    # Same Directory As The Final File, So The Rename At The End Is Atomic
+    temp = tempfile.NamedTemporaryFile(dir=path, prefix=".", suffix=".part", delete=False)
+    try:
+        for chunk in response.iter_content(chunk_size=1024*1024):
+            temp.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            buffer += chunk
+
+            # S3 Parts Must Be At Least 5 MB (Except The Last), So Only Start A Multipart Upload Once A Full Part Exists
+            while len(buffer) >= part_size:
+                if upload_id is None:
+                    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+
+                part_number: int = len(parts)+1
+                part = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=bytes(buffer[:part_size]))
+                parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+                del buffer[:part_size]
+
+        temp.close()
+
+        if upload_id is None:
+            s3.put_object(Bucket=bucket, Key=key, Body=bytes(buffer), ContentType=content_type)
+        else:
+            if len(buffer) > 0:
+                part_number: int = len(parts)+1
+                part = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=bytes(buffer))
+                parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+
+            s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}) # type: ignore
+
+        os.replace(temp.name, file)
+    except BaseException:
+        temp.close()
+        os.remove(temp.name)
+
+        if upload_id is not None:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+
+        raise
+    finally:
+        response.close()
+
+    # What S3 Reports As The ETag Of A Multipart Upload, Saves Re-Hashing The File When Syncing
+    part_etag: Optional[str] = None
+    if upload_id is not None:
+        part_etag = "%s-%s" % (hashlib.md5(b"".join(bytes.fromhex(part["ETag"].strip('"')) for part in parts)).hexdigest(), len(parts))
+
+    load_manifest().record_file(key=key, size=size, hash=digest.hexdigest(), content_type=content_type, url=url, mtime=os.path.getmtime(file), part_etag=part_etag)
+
 def handle_non_json_file(response: Response, line: int, elapsed: str, parent_key: str) -> None:
-    url: str = response.url
-    parsed: ParseResult = urlparse(url=url)
+    parsed: ParseResult = urlparse(url=response.url)
+    url: str = "%s://%s%s" % (parsed.scheme, parsed.netloc, parsed.path)  # Drop The api_key Query
 
     if parsed.netloc == "www.congress.gov":
         allowed_extensions: list = ["htm", "pdf", "txt", "xml"]
         extension: str = parsed.path.split(".")[-1]
         if extension in allowed_extensions:
             key: str = os.path.join(parent_key, "files", os.path.split(parsed.path)[1])
-            body: bytes = response.content
+
+            # Only The Headers Have Been Read So Far, So Skipping Here Saves The Whole Body
+            if load_manifest().exists(key=key):
+                print("\033[K%s (%s elapsed) - Skipping File %s" % (humanize.intcomma(line), elapsed, key), end="\r")
+                response.close()
+                return
 
             print("\033[K%s (%s elapsed) - Downloading File %s" % (humanize.intcomma(line), elapsed, key), end="\r")
-            save_local(key=key, body=body)
-            upload_file(key=key, body=body)
+            stream_file(key=key, response=response, url=url)
+            return
     else:
         print("\033[K%s (%s elapsed) - Skipping Unknown File %s" % (humanize.intcomma(line), elapsed, url), end="\r")
 
+    response.close()
+
+def is_json_object(body: bytes) -> bool:
+    """
+        Cheap Sanity Check Without Parsing, Catches Empty And Cut Off Bodies
+    """
+    stripped: bytes = body.strip()
+    return stripped.startswith(b"{") and stripped.endswith(b"}")
+
+class DownloadJob(NamedTuple):
+    url: str
+    parent_key: str
+    update_date: Optional[str] = None  # updateDate From The List Page, Saved Once The Download Succeeds
+    refresh: bool = False  # Download Again Even Though The Key Is Already On Disk
+    checkpoint: Optional[tuple[str, int]] = None  # (Checkpoint Name, Page Offset) This Job Was Queued From
+    attempt: int = 0  # Failed Attempts So Far, Rate Limits Don't Count
+    retried: bool = False  # Came From The Retry Queue, So It Has A Row There To Clear
+
 # TODO: This global breaks reusability, consider making a class
 line: int = 0
+line_lock: threading.Lock = threading.Lock()
 session: requests.Session = requests.Session()
-api_key: Generator[str, None, None] = get_api_key()
-def download_file(url: str, parent_key: str) -> None: # type: ignore
+request_timeout: int = 60  # Seconds To Connect, Or Between Bytes Of A Response, Before A Stalled Request Counts As Transient
+scheduler: Optional[KeyScheduler] = None
+scheduler_lock: threading.Lock = threading.Lock()
+def get_scheduler() -> KeyScheduler:
+    global scheduler
+
+    # Built On First Use So Importing This Module Doesn't Require API Keys
+    with scheduler_lock:
+        if scheduler is None:
+            scheduler = KeyScheduler(keys=load_config().get_api_keys(), limit=load_config().get_hourly_limit())
+
+        return scheduler
+
+def download_file(url: str, parent_key: str, update_date: Optional[str] = None, refresh: bool = False) -> list[str]: # type: ignore
+    """
+        Download And Save One URL, Returns The URLs In A Refreshed Document's New Body (Empty Otherwise)
+    """
     global line
     global start_time
     global session
 
     key: str = get_key(url=url)
 
-    line += 1
+    with line_lock:
+        line += 1
     elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start_time)))
     parsed: ParseResult = urlparse(url)
 
@@ -152,106 +273,293 @@ def download_file(url: str, parent_key: str) -> None: # type: ignore
     if parsed.netloc in skipped:
         # print("\033[KSkipping Host: %s" % parsed.netloc, end="\n")
         print("\033[K%s (%s elapsed) - Skipping %s" % (humanize.intcomma(line), elapsed, key), end="\r")
-        return
+        return []
 
     # Skip Download If Already Exists
-    if os.path.exists(os.path.join("data", "local", key)):
+    version: Optional[FileVersion] = load_manifest().get_version(key=key)
+    if version is not None and not refresh:
         print("\033[K%s (%s elapsed) - Skipping %s" % (humanize.intcomma(line), elapsed, key), end="\r")
-        return
+        return []
     
     url: str = "%s://%s%s" % (parsed.scheme, parsed.netloc, parsed.path)
-    params: dict = {
-        "api_key": next(api_key),
-        "format": "json"
-    }
-
-    # TODO: Figure out how to stream file to s3 bucket and to local filesystem
-    # TODO: Consider saving to OS' temporary folder and then moving from there, then uploading to S3
-    response: Response = session.get(url=url, params=params)
+
+    # Only api.congress.gov Counts Against The Key's Quota, Other Hosts (www.congress.gov Files) Never See The Key
+    params: dict = {}
+    if parsed.netloc == "api.congress.gov":
+        params = {
+            "api_key": get_scheduler().acquire(),
+            "format": "json"
+        }
+
+    # Let The Server Answer 304 Instead Of Resending A Copy We Already Have
+    headers: dict = {}
+    if version is not None and version.etag is not None:
+        headers["If-None-Match"] = version.etag
+    if version is not None and version.last_modified is not None:
+        headers["If-Modified-Since"] = version.last_modified
+
+    # Streamed, So Large Non-JSON Files Never Sit In Memory As A Whole
+    response: Response = session.get(url=url, params=params, headers=headers, stream=True, timeout=request_timeout)
+    if "api_key" in params:
+        get_scheduler().update(key=params["api_key"], headers=response.headers)
     content_type: Optional[str] = response.headers.get('content-type')
 
-    # TODO: Check if File Exists Before Downloading...
+    if response.status_code == 304:
+        print("\033[K%s (%s elapsed) - Unchanged %s" % (humanize.intcomma(line), elapsed, key), end="\r")
+        response.close()
+        load_manifest().record_version(key=key, update_date=update_date)
+        return []
+
     if content_type != "application/json":
+        if response.status_code != 200:
+            # An HTML Error Page From A Proxy Or Load Balancer, Not A File Worth Keeping
+            response.close()
+            raise DownloadError(failure=classify_status(status=response.status_code, keyed="api_key" in params), message=response.reason or "HTTP %s" % response.status_code, status=response.status_code)
+
         handle_non_json_file(response=response, line=line, elapsed=elapsed, parent_key=parent_key)
+        return []
+
+    body: bytes = response.content
+
+    if response.status_code != 200:
+        # Error Bodies Are Small And Need Parsing To Tell Rate Limits Apart, A Cut Off One Raises JSONDecodeError (Transient)
+        results: dict = json.loads(body)
+        error = results.get("error", results)
+        failure: Failure = classify_status(status=response.status_code, error=error, keyed="api_key" in params)
+
+        if failure is Failure.RATE_LIMIT:
+            # Only This Key Is Out Of Requests, So Park It And Let The Retry Queue Try Another One
+            print("\033[K%s (%s elapsed) - Parking API Key (%s): %s" % (humanize.intcomma(line), elapsed, url, response.text), end="\r")
+            get_scheduler().park(key=params["api_key"])
+        elif "matches the given query" in str(error):
+            print("\033[K%s (%s elapsed) - DJango Error (%s): %s" % (humanize.intcomma(line), elapsed, url, error), end="\r")
+        else:
+            print("\033[K%s (%s elapsed) - Unknown Error (%s): %s" % (humanize.intcomma(line), elapsed, url, response.text), end="\r")
+
+        raise DownloadError(failure=failure, message=str(error), status=response.status_code)
+
+    if not is_json_object(body=body):
+        raise DownloadError(failure=Failure.TRANSIENT, message="Truncated Or Malformed JSON (%s Bytes)" % humanize.intcomma(len(body)), status=response.status_code)
+
+    print("\033[K%s (%s elapsed) - Downloading %s" % (humanize.intcomma(line), elapsed, key), end="\r")
+
+    # Saved Byte For Byte As The API Sent It, Parsing And Re-Encoding Every Item Cost More Than The Download
+    save_json(key=key, body=body, content_type=content_type, url=url)
+    load_manifest().record_version(key=key, update_date=update_date, etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"))
+
+    # A First Download Is Followed Up By read_bills(), A Refresh Has To Bring Its Sub-Resources Along Itself
+    return list(scan_urls(raw=body)) if refresh else []
+
+
+async def parse_json(data: dict, parent_key: str, queue: asyncio.Queue) -> None:
+    for value in iter_urls(data=data):
+        await queue.put(DownloadJob(url=value, parent_key=parent_key))
+
+def handle_failure(job: DownloadJob, exception: Exception) -> None:
+    """
+        Send A Failed Job To The Retry Queue, Or Log It For Good Once It Can't Be Retried
+    """
+    failure: Failure = classify_exception(exception=exception)
+    status: Optional[int] = exception.status if isinstance(exception, DownloadError) else None
+    message: str = exception.message if isinstance(exception, DownloadError) else "%s: %s" % (type(exception).__name__, exception)
+
+    # Rate Limits Aren't The URL's Fault, So They Don't Count As An Attempt
+    attempt: int = job.attempt if failure is Failure.RATE_LIMIT else job.attempt + 1
+
+    policy: RetryPolicy = load_config().get_retry_policy()
+    if policy.should_retry(failure=failure, attempt=attempt):
+        load_retry_queue().push(url=job.url, parent_key=job.parent_key, update_date=job.update_date, refresh=job.refresh,
+                                attempt=attempt, failure=failure, message=message, delay=policy.backoff(attempt=max(attempt, 1)))
         return
 
+    load_retry_queue().remove(url=job.url)
+    log_error(url=job.url, message=message, status=status, key=get_key(url=job.url), attempt=attempt)
+
+def get_follow_ups(url: str, urls: list[str]) -> list[DownloadJob]:
+    """
+        Jobs For The URLs Found In A Refreshed Document
+
+        API URLs under the document's own folder (actions, text, cosponsors, ...) are refreshed
+        too, conditionally, since the document changing is the only sign they changed. Anything
+        else (files on www.congress.gov, other documents it links) is only fetched when missing.
+    """
+    parent_key: str = "/".join(get_key(url=url).split("/")[:-1])
+
+    jobs: list[DownloadJob] = []
+    for value in urls:
+        refresh: bool = urlparse(value).netloc == "api.congress.gov" and get_key(url=value).startswith(parent_key + "/") and get_key(url=value) != get_key(url=url)
+        if refresh or urlparse(value).netloc != "api.congress.gov":
+            jobs.append(DownloadJob(url=value, parent_key=parent_key, refresh=refresh))
+
+    return jobs
+
+async def run_job(job: DownloadJob) -> list[DownloadJob]:
+    """
+        Run One Job, Returns Its Follow-Ups
+    """
     try:
-        results: dict = response.json()
+        # download_file() blocks on requests, so it runs on the pool's threads
+        urls: list[str] = await asyncio.to_thread(download_file, job.url, job.parent_key, job.update_date, job.refresh)
 
-        if response.status_code != 200:
-            error = results["error"]
-
-            if "message" in error:
-                print("\033[K%s (%s elapsed) - Waiting 60 Minutes To Try Again (%s): %s" % (humanize.intcomma(line), elapsed, url, response.text), end="\r")
-                time.sleep(60*60)
-                download_file(url=url, parent_key=parent_key)
-            elif "matches the given query" in error:
-                print("\033[K%s (%s elapsed) - DJango Error (%s): %s" % (humanize.intcomma(line), elapsed, url, error), end="\r")
-                log_error(url=url, message=error)
-            else:
-                print("\033[K%s (%s elapsed) - Unknown Error (%s): %s" % (humanize.intcomma(line), elapsed, url, response.text), end="\r")
-                log_error(url=url, message=error)
-            
-            return
-        
-        print("\033[K%s (%s elapsed) - Downloading %s" % (humanize.intcomma(line), elapsed, key), end="\r")
+        if job.retried:
+            await asyncio.to_thread(load_retry_queue().remove, job.url)
+    except Exception as e:
+        await asyncio.to_thread(handle_failure, job, e)
+        return []
+
+    return get_follow_ups(url=job.url, urls=urls) if len(urls) > 0 else []
+
+async def download_worker(queue: asyncio.Queue) -> None:
+    while True:
+        job: DownloadJob = await queue.get()
+
+        try:
+            # Follow-Ups Stay On This Worker, Putting Them On The Bounded Queue Could Wait On Itself Forever
+            pending: list[DownloadJob] = [job]
+            visited: set[str] = set()
+            while len(pending) > 0:
+                current: DownloadJob = pending.pop()
+                if current.url in visited:
+                    continue
+
+                visited.add(current.url)
+                pending.extend(reversed(await run_job(job=current)))
+        finally:
+            if job.checkpoint is not None:
+                load_checkpoints().finish_item(name=job.checkpoint[0], offset=job.checkpoint[1])
+
+            queue.task_done()
+
+def start_download_workers(concurrency: int, connections: int = 0) -> tuple[asyncio.Queue, list[asyncio.Task]]:
+    global session
+
+    # Every Worker Needs Its Own Thread And Its Own Pooled Connection, Plus Any Extra Connections For List Pages
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency+1))
+    adapter: HTTPAdapter = HTTPAdapter(pool_connections=concurrency+connections, pool_maxsize=concurrency+connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # Bounded So Producers Wait On Workers Instead Of Buffering Whole Endpoints In RAM
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency*4)
+    workers: list[asyncio.Task] = [asyncio.create_task(download_worker(queue=queue)) for _ in range(concurrency)]
 
-        text: str = json.dumps(results)
-        save_local(key=key, body=text)
-        upload_file(key=key, body=text)
-    except:
-        print("\033[K%s (%s elapsed) - Read JSON Error: %s" % (humanize.intcomma(line), elapsed, response.text), end="\r")
-        log_error(url=url, message=response.text)
+    return queue, workers
 
+async def stop_download_workers(queue: asyncio.Queue, workers: list[asyncio.Task]) -> None:
+    await queue.join()
 
-def parse_json(data: dict, parent_key: str) -> None:
-    for (_, value) in dpath.search(data, '**/url', yielded=True):
-        # print("%s: %s" % (path, value))
-        download_file(url=value, parent_key=parent_key)
+    for worker in workers:
+        worker.cancel()
 
-def scantree(path: str = os.path.join("data", "local")) -> Generator[str, None, None]:
-    for entry in os.scandir(path=path):
-        if entry.is_dir():
-            yield from scantree(path=os.path.join(path, entry.name))
-        if entry.name.endswith(".json"):
-            yield os.path.join(path, entry.name)
+    await asyncio.gather(*workers, return_exceptions=True)
 
 # TODO: This global breaks reusability, consider making a class
 start_time: float = -1
-def read_bills() -> None:
+async def read_bills_async() -> None:
     global start_time
     start_time = time.time()
 
     if not os.path.exists(os.path.join("data", "local")):
         os.makedirs(os.path.join("data", "local"))
 
-    for file in scantree(path=os.path.join("data", "local")):
-        fd: int = os.open(file, os.O_RDONLY)
-        data: bytes = os.read(fd, os.fstat(fd).st_size)
-        contents: dict = json.loads(data)
-        os.close(fd=fd)
-
+    queue, workers = start_download_workers(concurrency=load_config().get_concurrency())
+    for file, contents in load_reader().documents(suffix=".json"):
         parent_key: str = "/".join(file.split(sep=os.path.sep)[2:-1])
-        parse_json(data=contents, parent_key=parent_key)
+        await parse_json(data=contents, parent_key=parent_key, queue=queue)
+
+    await stop_download_workers(queue=queue, workers=workers)
 
     print(end="\n")
     print("Finished Downloading Bills...", end="\n")
 
-def count_bills() -> int:
-    total: int = 0
-    start: float = time.time()
-    elapsed: str = humanize.naturaldelta(0)
+def extract_file_urls(files: list[CorpusEntry]) -> list[tuple[str, list[str]]]:
+    """
+        Scan A Batch Of Local Files And Return Each One's Parent Key And URLs
+
+        Runs inside the process pool, so it only touches the files it's given.
+    """
+    extracted: list[tuple[str, list[str]]] = []
+    for file in files:
+        try:
+            data: Union[bytes,memoryview] = load_reader().read(entry=file)
+        except FileNotFoundError:
+            if file.record is not None:
+                raise
+
+            continue  # Deleted Since The Manifest Last Saw It
+
+        # The URLs Are All That's Needed, So The Document Is Never Fully Parsed
+        parent_key: str = "/".join(file.path.split(sep=os.path.sep)[2:-1])
+        extracted.append((parent_key, list(scan_urls(raw=data)))) # type: ignore
+
+    return extracted
+
+async def read_bills_pipeline(batch_size: int = 64) -> None:
+    global start_time
+    start_time = time.time()
 
     if not os.path.exists(os.path.join("data", "local")):
         os.makedirs(os.path.join("data", "local"))
 
-    for _ in scantree(path=os.path.join("data", "local")):
-        total += 1
+    # Spawned Rather Than Forked, The Download Threads Below Could Hold Locks At Fork Time
+    parse_workers: int = load_config().get_parse_workers()
+    pool: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    queue, workers = start_download_workers(concurrency=load_config().get_concurrency())
+
+    seen: set[str] = set()
+    parsing: set[asyncio.Future] = set()
+
+    async def enqueue(extracted: list[tuple[str, list[str]]]) -> None:
+        for parent_key, urls in extracted:
+            for url in urls:
+                # The Same Detail URL Shows Up In Many Files (e.g. Every Bill Links Its Congress)
+                if url in seen:
+                    continue
+
+                seen.add(url)
+                await queue.put(DownloadJob(url=url, parent_key=parent_key))
+
+    batch: list[CorpusEntry] = []
+    for file in load_reader().entries(suffix=".json"):
+        batch.append(file)
+        if len(batch) < batch_size:
+            continue
 
-        if total % 1000 == 0:
-            current: float = time.time()
-            elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(current-start)))
-            print("\033[KFiles: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+        parsing.add(loop.run_in_executor(pool, extract_file_urls, batch))
+        batch = []
+
+        # Keep Every Parser Busy Without Reading The Whole Corpus Ahead Of The Downloaders
+        if len(parsing) >= parse_workers*2:
+            done, parsing = await asyncio.wait(parsing, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                await enqueue(extracted=future.result())
+
+    if len(batch) > 0:
+        parsing.add(loop.run_in_executor(pool, extract_file_urls, batch))
+
+    for future in asyncio.as_completed(parsing):
+        await enqueue(extracted=await future)
+
+    pool.shutdown()
+    await stop_download_workers(queue=queue, workers=workers)
+
+    print(end="\n")
+    print("Finished Downloading Bills...", end="\n")
+
+def read_bills(pipeline: bool = True) -> None:
+    if pipeline:
+        asyncio.run(read_bills_pipeline())
+    else:
+        asyncio.run(read_bills_async())
+
+def count_bills() -> int:
+    start: float = time.time()
+
+    # Only The Index Is Counted, Run manifest.py First To Pick Up Files Written Outside The Downloader
+    total: int = load_manifest().count(suffix=".json")
+    elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start)))
     
     print("\033[KTotal Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\n")
     print("-"*40, end="\n")
@@ -263,117 +571,285 @@ def hide_cursor(hide: bool) -> None:
     else:
         print("\033[?25h", end="\r")
 
-def get_s3_client() -> S3Client:
-    with open(os.path.join("data", "config.yml"), 'r') as fi:
-        config: dict = yaml.safe_load(fi)
-
-    if "s3" not in config:
-        raise KeyError('Missing S3 Section From Config')
-    elif "access_key_id" not in config["s3"]:
-        raise KeyError('Missing access_key_id Section From Config["s3"]')
-    elif "secret_access_key" not in config["s3"]:
-        raise KeyError('Missing secret_access_key Section From Config["s3"]')
-    elif "endpoint" not in config["s3"]:
-        raise KeyError('Missing endpoint Section From Config["s3"]')
-
-    # TODO: Determine if there's a type that can allow autocompletion of methods such as s3.put_object(...)
-    config = config["s3"]
-    s3: S3Client = boto3.client(
-        service_name='s3',
-        aws_access_key_id=config['access_key_id'],
-        aws_secret_access_key=config['secret_access_key'],
-        endpoint_url=config['endpoint']
-    )
-
-    return s3
-
-def get_default_s3_bucket() -> str:
-    with open(os.path.join("data", "config.yml"), 'r') as fi:
-        config: dict = yaml.safe_load(fi)
-
-    if "s3" not in config:
-        raise KeyError('Missing S3 Section From Config')
-    elif "default_bucket" not in config["s3"]:
-        raise KeyError('Missing default_bucket Section From Config["s3"]')
-
-    return config["s3"]["default_bucket"]
-
 def signal_handler(sig, frame) -> None:
     # print("\b\b  ", end="\r")  # Note: Hiding Ctrl+C will be difficult without breaking portability
     print("\nExiting...", end="\n")
+    load_manifest().commit()
+    load_error_log().flush()
     hide_cursor(hide=False)
     sys.exit(0)
 
-def live_download() -> None:
+def get_page(endpoint: str, params: dict) -> dict:
+    """
+        Fetch A List Page, Retrying Rate Limits And Transient Failures With Backoff
+
+        Gives back the error body once it runs out of attempts, which callers log and checkpoint around.
+    """
+    global session
+
+    policy: RetryPolicy = load_config().get_retry_policy()
+    attempt: int = 0
+    while True:
+        params = dict(params)
+        params["api_key"] = get_scheduler().acquire()
+        params["format"] = "json"
+
+        try:
+            response: requests.Response = session.get(url=endpoint, params=params, timeout=request_timeout)
+            get_scheduler().update(key=params["api_key"], headers=response.headers)
+            results: dict = response.json()
+
+            if response.status_code == 200:
+                return results
+
+            failure: Failure = classify_status(status=response.status_code, error=results.get("error"))
+        except Exception as e:
+            failure: Failure = classify_exception(exception=e)
+            results: dict = {"error": {"status": None, "detail": "%s: %s" % (type(e).__name__, e)}}
+
+        if failure is Failure.RATE_LIMIT:
+            # Another Key Can Take It Straight Away, acquire() Waits If None Are Left
+            get_scheduler().park(key=params["api_key"])
+            continue
+
+        attempt += 1
+        if not policy.should_retry(failure=failure, attempt=attempt):
+            return results
+
+        time.sleep(policy.backoff(attempt=attempt))
+
+def is_unchanged(version: Optional[FileVersion], update_date: str) -> bool:
+    if version is None:
+        return False
+
+    if version.update_date is not None:
+        return version.update_date == update_date
+
+    # Downloaded Before Versions Were Tracked, Unchanged If Our Copy Is Newer Than The Last Upstream Update
+    if version.fetched is None:
+        return False
+
+    try:
+        updated: datetime.datetime = datetime.datetime.fromisoformat(update_date.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+
+    if updated.tzinfo is None:
+        # Date Only (e.g. 2022-09-29), Could Have Changed Any Time That Day
+        updated = updated.replace(tzinfo=datetime.timezone.utc) + datetime.timedelta(days=1)
+
+    return version.fetched > updated.timestamp()
+
+def save_record(key: str, record: dict) -> None:
+    if load_manifest().exists(key=key):
+        return
+
+    save_json(key=key, body=json.dumps(record), content_type="application/json")
+
+async def queue_page(paginator: Paginator, name: str, offset: int, results: dict, incremental: bool, queue: asyncio.Queue) -> bool:
+    """
+        Queue A List Page's Detail URLs, Returns True When Every Dated Item On It Was Unchanged
+    """
+    for key, record in paginator.get_records(results=results):
+        await asyncio.to_thread(save_record, key, record)
+
+    dated: int = 0
+    unchanged: int = 0
+    jobs: list[DownloadJob] = []
+    for item in paginator.get_items(results=results):
+        # print("\033[K%s - %s" % (item.url, response.url))
+        parent_key: str = item.parent_key if item.parent_key is not None else "/".join(get_key(url=item.url).split(sep=os.path.sep)[:-1])
+
+        if item.update_date is None:
+            jobs.append(DownloadJob(url=item.url, parent_key=parent_key, checkpoint=(name, offset)))
+            continue
+
+        dated += 1
+        if incremental:
+            version: Optional[FileVersion] = load_manifest().get_version(key=get_key(url=item.url))
+            if is_unchanged(version=version, update_date=item.update_date):
+                unchanged += 1
+                load_manifest().record_version(key=get_key(url=item.url), update_date=item.update_date)
+                continue
+
+            jobs.append(DownloadJob(url=item.url, parent_key=parent_key, update_date=item.update_date, refresh=version is not None, checkpoint=(name, offset)))
+        else:
+            jobs.append(DownloadJob(url=item.url, parent_key=parent_key, update_date=item.update_date, checkpoint=(name, offset)))
+
+    # The Page Is Only Checkpointed Once Every Job From It Has Finished
+    load_checkpoints().begin_page(name=name, offset=offset, count=paginator.get_count(results=results) or 0, jobs=len(jobs))
+    for job in jobs:
+        await queue.put(job)
+
+    return dated > 0 and unchanged == dated
+
+async def crawl_shard(paginator: Paginator, shard: dict, incremental: bool, queue: asyncio.Queue, pages: ThreadPoolExecutor, semaphore: asyncio.Semaphore) -> None:
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    sort: Optional[str] = "updateDate desc" if incremental and paginator.sortable else None
+    name: str = paginator.get_name(shard=shard, sort=sort)
+
+    # Pick Up Where The Last Run Left Off
+    offset: int = load_checkpoints().get_offset(name=name)
+
+    # The First Page Tells Us How Many Pages There Are, Every Page Holds The Semaphore Until Its Jobs Are Queued
+    async with semaphore:
+        results: dict = await loop.run_in_executor(pages, get_page, paginator.endpoint, paginator.get_params(shard=shard, offset=offset, sort=sort))
+
+        total: Optional[int] = paginator.get_count(results=results)
+        if total is None:
+            log_error(url="%s?offset=%s" % (name, offset), message=json.dumps(results))
+            return  # Keep The Checkpoint So The Next Run Retries From Here
+
+        stop: bool = await queue_page(paginator=paginator, name=name, offset=offset, results=results, incremental=incremental, queue=queue)
+
+    if sort is not None:
+        # Sorted Newest First, So Walk In Order And Stop At A Page With Nothing New, The Rest Of The Endpoint Is Old Too
+        while not stop and (total-offset-paginator.page_size)>0:
+            offset += paginator.page_size
+            async with semaphore:
+                results: dict = await loop.run_in_executor(pages, get_page, paginator.endpoint, paginator.get_params(shard=shard, offset=offset, sort=sort))
+
+                if paginator.get_count(results=results) is None:
+                    log_error(url="%s?offset=%s" % (name, offset), message=json.dumps(results))
+                    return
+
+                stop = await queue_page(paginator=paginator, name=name, offset=offset, results=results, incremental=incremental, queue=queue)
+
+        load_checkpoints().end(name=name)
+        return
+
+    async def crawl_page(page_offset: int) -> bool:
+        # Held Until The Page's Jobs Are Queued, So At Most page_concurrency Fetched Pages Wait On A Full Queue
+        async with semaphore:
+            page: dict = await loop.run_in_executor(pages, get_page, paginator.endpoint, paginator.get_params(shard=shard, offset=page_offset, sort=sort))
+
+            if paginator.get_count(results=page) is None:
+                log_error(url="%s?offset=%s" % (name, page_offset), message=json.dumps(page))
+                return False
+
+            await queue_page(paginator=paginator, name=name, offset=page_offset, results=page, incremental=incremental, queue=queue)
+            return True
+
+    # Every Remaining Offset Is Known Now, Fetch Them Side By Side
+    crawled: list[bool] = await asyncio.gather(*(crawl_page(page_offset=page_offset) for page_offset in range(offset+paginator.page_size, total, paginator.page_size)))
+
+    if all(crawled):
+        load_checkpoints().end(name=name)
+
+async def crawl_endpoint(paginator: Paginator, incremental: bool, queue: asyncio.Queue, pages: ThreadPoolExecutor, page_concurrency: int) -> None:
+    # Shared By Every Shard, So A Sharded Endpoint Still Only Has page_concurrency Requests Out
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(page_concurrency)
+    await asyncio.gather(*(crawl_shard(paginator=paginator, shard=shard, incremental=incremental, queue=queue, pages=pages, semaphore=semaphore) for shard in paginator.get_shards()))
+
+async def live_download_async(incremental: bool = False) -> None:
     global start_time
     start_time = time.time()
 
-    endpoints: list = [
-        "https://api.congress.gov/v3/congress",  # 118
-        "https://api.congress.gov/v3/summaries",  # 375
-        "https://api.congress.gov/v3/committee",  # 714
-        "https://api.congress.gov/v3/treaty",  # 782
-        "https://api.congress.gov/v3/member",  # 2,515
-        "https://api.congress.gov/v3/house-requirement",  # 3,226
-        # "https://api.congress.gov/v3/congressional-record",  # 5,148 - Uses A Different Pagination System
-        "https://api.congress.gov/v3/house-communication",  # 30,487
-        "https://api.congress.gov/v3/nomination",  # 41,448
-        "https://api.congress.gov/v3/committee-report",  # 47,464
-        "https://api.congress.gov/v3/amendment",  # 117,324
-        "https://api.congress.gov/v3/senate-communication",  # 164,335
-        "https://api.congress.gov/v3/bill"  # 394,438
+    paginators: list[Paginator] = [
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/congress"),  # 118
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/summaries", sortable=True),  # 375
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/committee"),  # 714
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/treaty"),  # 782
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/member"),  # 2,515
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/house-requirement"),  # 3,226
+        CongressionalRecordPaginator(endpoint="https://api.congress.gov/v3/congressional-record"),  # 5,148 - Sharded By Month
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/house-communication"),  # 30,487
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/nomination"),  # 41,448
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/committee-report"),  # 47,464
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/amendment"),  # 117,324
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/senate-communication"),  # 164,335
+        OffsetPaginator(endpoint="https://api.congress.gov/v3/bill", sortable=True)  # 394,438
     ]
 
-    api_key: Generator[str, None, None] = get_api_key()
-    session: requests.Session = requests.Session()
-    for endpoint in endpoints:
-        params: dict = {
-            "api_key": next(api_key),
-            "offset": 0,
-            "limit": 250,
-            "format": "json"
-        }
+    # List Pages Get Their Own Threads So They Never Wait Behind Detail Downloads
+    page_concurrency: int = load_config().get_page_concurrency()
+    pages: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=len(paginators)*page_concurrency)
 
-        response: requests.Response = session.get(url=endpoint, params=params)
+    queue, workers = start_download_workers(concurrency=load_config().get_concurrency(), connections=len(paginators)*page_concurrency)
+    await asyncio.gather(*(crawl_endpoint(paginator=paginator, incremental=incremental, queue=queue, pages=pages, page_concurrency=page_concurrency) for paginator in paginators))
+    await drain_retries(queue=queue)
+    await stop_download_workers(queue=queue, workers=workers)
 
-        # TODO: Determine if should put other checks...
+    pages.shutdown()
 
-        results: dict = response.json()
+async def drain_retries(queue: asyncio.Queue) -> None:
+    """
+        Feed The Retry Queue Back Through The Workers Until Nothing Is Left That Can Still Succeed
+    """
+    retries = load_retry_queue()
+    policy: RetryPolicy = load_config().get_retry_policy()
 
-        # Check in case we get an error message
-        total: int = 0  # TODO: Count Array of Items (Variable Name)
-        if "pagination" in results:
-            total: int = results["pagination"]["count"]
-            results.pop("pagination")  # Don't Get Stuck In Loop
+    while True:
+        # Let Everything In Flight Finish First, Failures Land Back In The Retry Queue
+        await queue.join()
+
+        items = await asyncio.to_thread(retries.take_due)
+        if len(items) > 0:
+            print("\033[KRetrying %s Failed Downloads" % humanize.intcomma(len(items)), end="\r")
+            for item in items:
+                await queue.put(DownloadJob(url=item.url, parent_key=item.parent_key, update_date=item.update_date, refresh=item.refresh, attempt=item.attempt, retried=True))
+
+            continue
 
-        if "offset" not in params or type(params["offset"]) != int:
+        due: Optional[float] = await asyncio.to_thread(retries.next_due)
+        if due is None:
             return
 
-        while (total-params["offset"])>0:
-            if "offset" not in params or type(params["offset"]) != int:
-                return
+        # Backoff Never Goes Past max_delay, Anything Further Out Was Left By Another Run
+        wait: float = due - time.time()
+        if wait > policy.max_delay:
+            return
 
-            params["offset"] = params["offset"]+250 # type: ignore
+        await asyncio.sleep(max(wait, 0))
 
-            response: requests.Response = session.get(url=endpoint, params=params)
-            results: dict = response.json()
+async def retry_download_async() -> None:
+    global start_time
+    start_time = time.time()
 
-            # Check in case we get an error message
-            if "pagination" in results:
-                total: int = results["pagination"]["count"]
-                results.pop("pagination")  # Don't Get Stuck In Loop
+    queue, workers = start_download_workers(concurrency=load_config().get_concurrency())
+    await drain_retries(queue=queue)
+    await stop_download_workers(queue=queue, workers=workers)
+
+def show_checkpoints() -> None:
+    state: dict = load_checkpoints().state
+    if len(state) == 0:
+        print("No Saved Checkpoints, Every Endpoint Starts From The Beginning")
+        return
 
-            for (_, value) in dpath.search(results, '**/url', yielded=True):
-                # print("%s: %s" % (path, value))
-                # print("\033[K%s - %s" % (value, response.url))
-                parent_key: str = "/".join(get_key(url=value).split(sep=os.path.sep)[:-1])
-                download_file(url=value, parent_key=parent_key)
+    for name, checkpoint in state.items():
+        print("%s\t%s/%s\tLast Page: %s" % (name, humanize.intcomma(checkpoint["offset"]), humanize.intcomma(checkpoint["count"]), checkpoint["updated"]))
+
+def live_download(incremental: bool = False) -> None:
+    asyncio.run(live_download_async(incremental=incremental))
 
 
 if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Download Congress.gov API Data")
+    parser.add_argument("--incremental", action="store_true", help="Only re-download items whose updateDate changed since they were saved")
+    parser.add_argument("--retry", action="store_true", help="Only retry the downloads waiting in data/retry.db")
+    parser.add_argument("--checkpoints", action="store_true", help="Show saved pagination checkpoints and exit")
+    parser.add_argument("--reset-checkpoints", nargs="*", metavar="ENDPOINT", help="Forget saved pagination checkpoints (all of them if no endpoint is given) and exit")
+    args: argparse.Namespace = parser.parse_args()
+
+    if args.checkpoints:
+        show_checkpoints()
+        sys.exit(0)
+
+    if args.reset_checkpoints is not None:
+        load_checkpoints().reset(names=args.reset_checkpoints)
+        print("Reset %s" % (", ".join(args.reset_checkpoints) if len(args.reset_checkpoints) > 0 else "All Checkpoints"))
+        sys.exit(0)
+
     signal.signal(signal.SIGINT, signal_handler)
     hide_cursor(hide=True)
-    live_download()
+
+    if args.retry:
+        print("%s Downloads Waiting To Be Retried" % humanize.intcomma(load_retry_queue().count()))
+        asyncio.run(retry_download_async())
+        hide_cursor(hide=False)
+        sys.exit(0)
+
+    live_download(incremental=args.incremental)
     count_bills()
     read_bills()
     hide_cursor(hide=False)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import os
+import csv
+import atexit
+import datetime
+import threading
+
+from typing import Optional
+
+
+class ErrorLog:
+    """
+        Buffered Writer For data/errors.csv
+
+        Rows are kept in memory and appended in one write once the buffer reaches
+        batch rows or interval seconds have passed, whichever comes first. Both locks
+        are reentrant, so the SIGINT handler can flush even if it interrupted a log().
+    """
+    columns: list[str] = ["url", "message", "status", "key", "attempt", "timestamp"]
+
+    path: str
+    batch: int
+    interval: float
+    rows: list[list]
+    lock: threading.RLock
+    write_lock: threading.RLock
+    stopped: threading.Event
+    thread: threading.Thread
+
+    def __init__(self, path: str = os.path.join("data", "errors.csv"), batch: int = 500, interval: float = 5.0) -> None:
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.rows = []
+        self.lock = threading.RLock()
+        self.write_lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.set_aside()
+
+        self.thread = threading.Thread(target=self.flush_periodically, daemon=True)
+        self.thread.start()
+
+    def set_aside(self) -> None:
+        """
+            Move An errors.csv With Different Columns (e.g. The Old url, message Layout) Out Of The Way
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+
+        with open(self.path, 'r', newline='') as fi:
+            header: list[str] = next(csv.reader(fi), [])
+
+        if header == self.columns:
+            return
+
+        root, extension = os.path.splitext(self.path)
+        moved: str = "%s-%s%s" % (root, datetime.datetime.now().strftime("%Y%m%d%H%M%S"), extension)
+        os.replace(self.path, moved)
+        print("Moved %s To %s, Its Columns Don't Match" % (self.path, moved))
+
+    def log(self, url: str, message: str, status: Optional[int] = None, key: Optional[str] = None, attempt: Optional[int] = None) -> None:
+        timestamp: str = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+
+        with self.lock:
+            self.rows.append([url, message, status, key, attempt, timestamp])
+            full: bool = len(self.rows) >= self.batch
+
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        # Swap The Buffer Out So Workers Can Keep Logging While The Rows Are Written
+        with self.lock:
+            rows: list[list] = self.rows
+            self.rows = []
+
+        if len(rows) == 0:
+            return
+
+        # Only One Writer At A Time, Or Batches Could Interleave
+        with self.write_lock:
+            directory: str = os.path.dirname(self.path) or "."
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+            header: bool = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'a', newline='') as fi:
+                writer = csv.writer(fi)
+                if header:
+                    writer.writerow(self.columns)
+
+                writer.writerows(rows)
+
+    def flush_periodically(self) -> None:
+        while not self.stopped.wait(timeout=self.interval):
+            self.flush()
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.flush()
+
+error_log: Optional[ErrorLog] = None
+error_log_lock: threading.Lock = threading.Lock()
+def load_error_log() -> ErrorLog:
+    global error_log
+
+    with error_log_lock:
+        if error_log is None:
+            error_log = ErrorLog()
+            atexit.register(error_log.close)
+
+        return error_log
@@ -0,0 +1,50 @@
+import re
+import json
+
+from re import Pattern
+from typing import Any, Generator
+
+
+def iter_urls(data: Any, key: str = "url") -> Generator[str, None, None]:
+    """
+        Every String Stored Under key, At Any Depth, In Document Order
+
+        Returns the same URLs as dpath.search(data, '**/url', yielded=True) without
+        building a path list for every node it visits.
+    """
+    stack: list = [data] if type(data) is dict or type(data) is list else []
+    while len(stack) > 0:
+        node: Any = stack.pop()
+
+        # Only URL Values Are Ever Pushed As Strings
+        if type(node) is str:
+            yield node
+        elif type(node) is dict:
+            # Reversed So Everything Comes Off The Stack In Document Order
+            for name, value in reversed(node.items()):
+                if type(value) is dict or type(value) is list:
+                    stack.append(value)
+                elif name == key and type(value) is str:
+                    stack.append(value)
+        elif type(node) is list:
+            stack.extend(value for value in reversed(node) if type(value) is dict or type(value) is list)
+
+url_regexes: dict[bytes, Pattern[bytes]] = {}
+def scan_urls(raw: bytes, key: bytes = b"url") -> Generator[str, None, None]:
+    """
+        Same URLs As iter_urls(), Read Straight From The Raw JSON Without Parsing It
+
+        Inside a JSON string every quote is escaped, so an unescaped "url" followed by a
+        colon can only be an object key.
+    """
+    if key not in url_regexes:
+        url_regexes[key] = re.compile(rb'"' + re.escape(key) + rb'"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+    for match in url_regexes[key].finditer(raw):
+        value: bytes = match.group(1)
+
+        # Only Pay For A Real Decode When The String Has Escapes (e.g. \/ or \u00e9)
+        if b"\\" in value:
+            yield json.loads(b'"' + value + b'"')
+        else:
+            yield value.decode()
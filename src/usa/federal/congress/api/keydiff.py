@@ -0,0 +1,102 @@
+import os
+import json
+import heapq
+import tempfile
+
+from typing import Any, Iterable, Iterator, Optional, Generator
+
+
+class JsonArrayWriter:
+    """
+        Writes A JSON List One Item At A Time, So It Never Has To Be Held In Memory
+    """
+    path: str
+    count: int
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+
+        directory: str = os.path.dirname(path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.file = open(path, mode="w")
+        self.file.write("[")
+
+    def write(self, item: Any) -> None:
+        if self.count > 0:
+            self.file.write(", ")
+
+        self.file.write(json.dumps(item))
+        self.count += 1
+
+    def close(self) -> None:
+        self.file.write("]")
+        self.file.close()
+
+def write_run(rows: list[list], directory: str) -> str:
+    rows.sort(key=lambda row: row[0])
+
+    fd, path = tempfile.mkstemp(dir=directory, prefix="run-", suffix=".jsonl")
+    with os.fdopen(fd, mode="w") as f:
+        for row in rows:
+            f.write(json.dumps(row))
+            f.write("\n")
+
+    return path
+
+def read_rows(path: str) -> Generator[list, None, None]:
+    with open(path, mode="r") as f:
+        for line in f:
+            yield json.loads(line)
+
+def external_sort(rows: Iterable[list], directory: str, run_size: int = 500000) -> str:
+    """
+        Sort Rows By Their First Column (The Key) Into One JSON Lines File
+
+        At most run_size rows are in memory at once. Each full batch is sorted and written
+        as a run, then the runs are merged. Python and SQLite's default collation both
+        compare keys by code point, so the result lines up with ORDER BY key.
+    """
+    runs: list[str] = []
+    batch: list[list] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= run_size:
+            runs.append(write_run(rows=batch, directory=directory))
+            batch = []
+
+    runs.append(write_run(rows=batch, directory=directory))
+    if len(runs) == 1:
+        return runs[0]
+
+    fd, path = tempfile.mkstemp(dir=directory, prefix="sorted-", suffix=".jsonl")
+    with os.fdopen(fd, mode="w") as f:
+        for row in heapq.merge(*(read_rows(path=run) for run in runs), key=lambda row: row[0]):
+            f.write(json.dumps(row))
+            f.write("\n")
+
+    for run in runs:
+        os.remove(run)
+
+    return path
+
+def merge_join(left: Iterator[list], right: Iterator[list]) -> Generator[tuple[Optional[list], Optional[list]], None, None]:
+    """
+        Walk Two Key-Sorted Row Streams Together, Yielding (Left, Right) With None For A Missing Side
+    """
+    left_row: Optional[list] = next(left, None)
+    right_row: Optional[list] = next(right, None)
+
+    while left_row is not None or right_row is not None:
+        if right_row is None or (left_row is not None and left_row[0] < right_row[0]):
+            yield left_row, None
+            left_row = next(left, None)
+        elif left_row is None or right_row[0] < left_row[0]:
+            yield None, right_row
+            right_row = next(right, None)
+        else:
+            yield left_row, right_row
+            left_row = next(left, None)
+            right_row = next(right, None)
@@ -0,0 +1,422 @@
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+
+from walker import walk
+from shards import ShardRecord, load_archive
+from typing import Union, Optional, Generator, NamedTuple
+
+
+class FileVersion(NamedTuple):
+    update_date: Optional[str]  # updateDate From The List Endpoint
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched: Optional[float]  # When The Copy On Disk Was Downloaded
+
+class LocalHash(NamedTuple):
+    size: int
+    mtime: float
+    hash: str  # md5 Of The Whole File, What S3 Uses As The ETag For A Single put_object
+    part_etag: Optional[str]  # ETag S3 Gives A Multipart Upload Of The File, None If It Fits In One Part
+    other_part_size: Optional[int] = None  # Part Size Of The Last Object Found Uploaded With Parts Other Than 8 MiB
+    other_part_etag: Optional[str] = None  # The File's Multipart ETag At other_part_size
+
+def hash_file(path: str, part_size: int = 8*1024*1024, chunk_size: int = 1024*1024) -> tuple[str, Optional[str]]:
+    """
+        md5 And Multipart ETag (md5 Of Each Part's md5, Then "-<Parts>") In One Read
+    """
+    digest = hashlib.md5()
+    part = hashlib.md5()
+    part_digests: list[bytes] = []
+    part_read: int = 0
+
+    with open(path, mode="rb") as f:
+        while True:
+            chunk: bytes = f.read(min(chunk_size, part_size - part_read))
+            if len(chunk) == 0:
+                break
+
+            digest.update(chunk)
+            part.update(chunk)
+            part_read += len(chunk)
+
+            if part_read == part_size:
+                part_digests.append(part.digest())
+                part = hashlib.md5()
+                part_read = 0
+
+    if part_read > 0:
+        part_digests.append(part.digest())
+
+    if len(part_digests) <= 1:
+        return digest.hexdigest(), None
+
+    return digest.hexdigest(), "%s-%s" % (hashlib.md5(b"".join(part_digests)).hexdigest(), len(part_digests))
+
+def hash_data(data: Union[bytes,memoryview], part_size: int = 8*1024*1024) -> tuple[str, Optional[str]]:
+    """
+        Same As hash_file() For A Body Already In Memory (e.g. A Shard Record)
+    """
+    parts: list[bytes] = [hashlib.md5(data[start:start + part_size]).digest() for start in range(0, len(data), part_size)]
+    if len(parts) <= 1:
+        return hashlib.md5(data).hexdigest(), None
+
+    return hashlib.md5(data).hexdigest(), "%s-%s" % (hashlib.md5(b"".join(parts)).hexdigest(), len(parts))
+
+class Manifest:
+    """
+        SQLite Index Of Every File Saved Under data/local
+
+        Keys are stored the same way get_key() builds them (e.g. usa/federal/congress/bills/...),
+        so checking for a file or counting files never has to touch the filesystem.
+    """
+    path: str
+    connection: sqlite3.Connection
+    lock: threading.RLock
+    pending: int  # Writes Since The Last Commit
+    batch: int  # Writes Allowed Before Committing
+    reconciled: set[str]  # Roots Already Reconciled By This Process
+
+    def __init__(self, path: str = os.path.join("data", "manifest.db"), batch: int = 256) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self.pending = 0
+        self.batch = batch
+        self.reconciled = set()
+
+        directory: str = os.path.dirname(path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Shared Between Download Threads, Every Access Goes Through self.lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                hash TEXT,
+                content_type TEXT,
+                url TEXT,
+                fetched REAL
+            )
+        """)
+
+        # Added For Incremental Refreshes, Older Manifests Get The Columns On First Open
+        columns: list[str] = [row[1] for row in self.connection.execute("PRAGMA table_info(files)")]
+        for column in ["update_date", "etag", "last_modified"]:
+            if column not in columns:
+                self.connection.execute("ALTER TABLE files ADD COLUMN %s TEXT" % column)
+
+        # Added For Bucket Syncing, A Hash Is Only Trusted While The File's mtime And Size Match
+        if "mtime" not in columns:
+            self.connection.execute("ALTER TABLE files ADD COLUMN mtime REAL")
+        if "part_etag" not in columns:
+            self.connection.execute("ALTER TABLE files ADD COLUMN part_etag TEXT")
+        if "other_part_size" not in columns:
+            self.connection.execute("ALTER TABLE files ADD COLUMN other_part_size INTEGER")
+        if "other_part_etag" not in columns:
+            self.connection.execute("ALTER TABLE files ADD COLUMN other_part_etag TEXT")
+
+        # Directory mtimes And Subdirectories From The Last reconcile(), Unchanged Directories Aren't Listed Again
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                mtime INTEGER NOT NULL,
+                subdirectories TEXT NOT NULL
+            )
+        """)
+        if "files" not in [row[1] for row in self.connection.execute("PRAGMA table_info(directories)")]:
+            self.connection.execute("ALTER TABLE directories ADD COLUMN files TEXT")
+
+        self.connection.commit()
+
+    def record(self, key: str, body: Union[str,bytes], content_type: Optional[str] = None, url: Optional[str] = None, mtime: Optional[float] = None) -> None:
+        data: bytes = body.encode() if type(body) is str else body # type: ignore
+        self.record_file(key=key, size=len(data), hash=hashlib.md5(data).hexdigest(), content_type=content_type, url=url, mtime=mtime)
+
+    def record_file(self, key: str, size: int, hash: Optional[str] = None, content_type: Optional[str] = None, url: Optional[str] = None, fetched: Optional[float] = None, mtime: Optional[float] = None, part_etag: Optional[str] = None) -> None:
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (key, size, hash, content_type, url, fetched, mtime, part_etag) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, size, hash, content_type, url, time.time() if fetched is None else fetched, mtime, part_etag)
+            )
+            self.commit_if_needed()
+
+    def get_local_hash(self, key: str, root: str = os.path.join("data", "local"), part_size: int = 8*1024*1024) -> Optional[LocalHash]:
+        """
+            Hash Of The File On Disk, Only Re-Read When Its Size Or mtime Changed Since It Was Last Hashed
+
+            A key whose file was removed after packing is hashed from its shard record instead.
+        """
+        try:
+            stat: os.stat_result = os.stat(os.path.join(root, key))
+        except FileNotFoundError:
+            return self.get_packed_hash(key=key, part_size=part_size)
+
+        with self.lock:
+            row: Optional[tuple] = self.connection.execute("SELECT size, mtime, hash, part_etag, other_part_size, other_part_etag FROM files WHERE key = ?", (key,)).fetchone()
+
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime and row[2] is not None and (stat.st_size <= part_size or row[3] is not None):
+            return LocalHash(size=row[0], mtime=row[1], hash=row[2], part_etag=row[3], other_part_size=row[4], other_part_etag=row[5])
+
+        hash, part_etag = hash_file(path=os.path.join(root, key), part_size=part_size)
+        with self.lock:
+            if row is None:
+                self.connection.execute("INSERT INTO files (key, size, hash, mtime, part_etag) VALUES (?, ?, ?, ?, ?)", (key, stat.st_size, hash, stat.st_mtime, part_etag))
+            else:
+                self.connection.execute("UPDATE files SET size = ?, hash = ?, mtime = ?, part_etag = ?, other_part_size = NULL, other_part_etag = NULL WHERE key = ?", (stat.st_size, hash, stat.st_mtime, part_etag, key))
+            self.commit_if_needed()
+
+        return LocalHash(size=stat.st_size, mtime=stat.st_mtime, hash=hash, part_etag=part_etag)
+
+    def get_packed_hash(self, key: str, part_size: int = 8*1024*1024) -> Optional[LocalHash]:
+        """
+            Hash Of A Key That Only Lives In The Shard Archive, Cached Against The Record's packed Time
+        """
+        archive = load_archive()
+        record: Optional[ShardRecord] = archive.get_record(key=key) if archive is not None else None
+        if archive is None or record is None:
+            return None
+
+        packed: float = record.packed if record.packed is not None else 0.0
+        with self.lock:
+            row: Optional[tuple] = self.connection.execute("SELECT size, mtime, hash, part_etag, other_part_size, other_part_etag FROM files WHERE key = ?", (key,)).fetchone()
+
+        if row is not None and row[0] == record.size and row[1] == packed and row[2] is not None:
+            return LocalHash(size=row[0], mtime=row[1], hash=row[2], part_etag=row[3], other_part_size=row[4], other_part_etag=row[5])
+
+        hash, part_etag = hash_data(data=archive.read(record=record), part_size=part_size)
+        with self.lock:
+            if row is None:
+                self.connection.execute("INSERT INTO files (key, size, hash, mtime, part_etag) VALUES (?, ?, ?, ?, ?)", (key, record.size, hash, packed, part_etag))
+            else:
+                self.connection.execute("UPDATE files SET size = ?, hash = ?, mtime = ?, part_etag = ?, other_part_size = NULL, other_part_etag = NULL WHERE key = ?", (record.size, hash, packed, part_etag, key))
+            self.commit_if_needed()
+
+        return LocalHash(size=record.size, mtime=packed, hash=hash, part_etag=part_etag)
+
+    def record_part_etag(self, key: str, local: LocalHash, part_size: int, part_etag: str) -> None:
+        """
+            Cache A Multipart ETag For A Part Size Other Than 8 MiB, Only While The File Is Still The One That Was Hashed
+        """
+        with self.lock:
+            self.connection.execute("UPDATE files SET other_part_size = ?, other_part_etag = ? WHERE key = ? AND size = ? AND mtime = ?", (part_size, part_etag, key, local.size, local.mtime))
+            self.commit_if_needed()
+
+    def commit_if_needed(self) -> None:
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.commit()
+
+    def commit(self) -> None:
+        with self.lock:
+            self.connection.commit()
+            self.pending = 0
+
+    def record_version(self, key: str, update_date: Optional[str] = None, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """
+            Remember Which Upstream Version Of A Key Is On Disk
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE files SET update_date = COALESCE(?, update_date), etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (update_date, etag, last_modified, key)
+            )
+            self.commit_if_needed()
+
+    def get_version(self, key: str) -> Optional[FileVersion]:
+        with self.lock:
+            row: Optional[tuple] = self.connection.execute("SELECT update_date, etag, last_modified, fetched FROM files WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        return FileVersion(update_date=row[0], etag=row[1], last_modified=row[2], fetched=row[3])
+
+    def exists(self, key: str) -> bool:
+        """
+            Whether The Key Is Saved Locally, Either On Disk Or Packed Into The Shard Archive
+        """
+        with self.lock:
+            if self.connection.execute("SELECT 1 FROM files WHERE key = ?", (key,)).fetchone() is not None:
+                return True
+
+        archive = load_archive()
+        return archive is not None and archive.exists(key=key)
+
+    def count(self, suffix: str = ".json") -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM files WHERE key LIKE ?", ("%" + suffix,)).fetchone()[0]
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def keys(self, suffix: str = ".json", exclude: Optional[str] = None) -> Generator[str, None, None]:
+        """
+            Every Key Ending In suffix, Minus Those In The records Table Of The exclude Database (e.g. The Shard Index)
+
+            A key saved again after it was packed (mtime or fetched past the record's packed time) is kept.
+        """
+        self.commit()
+
+        # Separate Read Connection, WAL Lets It Stream Keys While Download Threads Keep Writing
+        reader: sqlite3.Connection = sqlite3.connect(self.path)
+        try:
+            if exclude is None:
+                cursor: sqlite3.Cursor = reader.execute("SELECT key FROM files WHERE key LIKE ?", ("%" + suffix,))
+            else:
+                reader.execute("ATTACH DATABASE ? AS excluded", (exclude,))
+                cursor: sqlite3.Cursor = reader.execute("SELECT key FROM files WHERE key LIKE ? AND NOT EXISTS "
+                                                        "(SELECT 1 FROM excluded.records WHERE records.key = files.key AND NOT IFNULL(COALESCE(files.mtime, files.fetched) > records.packed, 0))", ("%" + suffix,))
+
+            for (key,) in cursor:
+                yield key
+        finally:
+            reader.close()
+
+    def paths(self, suffix: str = ".json", root: str = os.path.join("data", "local"), exclude: Optional[str] = None) -> Generator[str, None, None]:
+        """
+            Same Paths A Walk Of root Would Yield, Read From The Index Instead Of The Disk
+        """
+        for key in self.keys(suffix=suffix, exclude=exclude):
+            yield os.path.join(root, key)
+
+    def import_tree(self, root: str = os.path.join("data", "local")) -> int:
+        """
+            Index Files That Were Saved Before The Manifest Existed
+
+            Only size and mtime are recorded, hashes are left empty so this stays a metadata-only walk.
+        """
+        total: int = 0
+        for entry in walk(path=root, suffix=""):
+            # Unfinished Download From stream_file()
+            if entry.path.endswith(".part"):
+                continue
+
+            key: str = "/".join(os.path.relpath(entry.path, root).split(os.path.sep))
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO files (key, size, fetched) VALUES (?, ?, ?)",
+                    (key, entry.size, entry.mtime)
+                )
+            total += 1
+
+            if total % 10000 == 0:
+                self.commit()
+
+        self.commit()
+        return total
+
+    def reconcile(self, root: str = os.path.join("data", "local"), force: bool = False) -> int:
+        """
+            Index Files Written Without save_local() (download-bulk.py, Files Copied In By Hand)
+
+            Adding, renaming or removing a file changes its directory's mtime, so only directories
+            whose mtime moved since the last reconcile are listed, the rest cost one stat() each.
+            A listed directory is compared with the names it had last time, and keys for files
+            or whole subdirectories that are gone are dropped. Runs once per root per process
+            unless forced. Returns how many files were new, changed or removed.
+        """
+        if root in self.reconciled and not force:
+            return 0
+
+        total: int = 0
+        stack: list[str] = [root]
+        while len(stack) > 0:
+            path: str = stack.pop()
+            try:
+                mtime: int = os.stat(path).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+            with self.lock:
+                row: Optional[tuple] = self.connection.execute("SELECT mtime, subdirectories, files FROM directories WHERE path = ?", (path,)).fetchone()
+
+            if row is not None and row[0] == mtime:
+                stack.extend(os.path.join(path, name) for name in row[1].split("\n") if name != "")
+                continue
+
+            prefix: str = "" if path == root else "/".join(os.path.relpath(path, root).split(os.path.sep)) + "/"
+            subdirectories: list[str] = []
+            names: list[str] = []
+            files: list[tuple] = []
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.name)
+                    elif not entry.name.endswith(".part"):
+                        try:
+                            stat: os.stat_result = entry.stat(follow_symlinks=False)
+                        except FileNotFoundError:
+                            continue
+
+                        names.append(entry.name)
+                        files.append((prefix + entry.name, stat.st_size, stat.st_mtime, stat.st_mtime))
+
+            # Only Known Once The Directory Has Been Listed Before
+            removed_files: list[str] = []
+            removed_directories: list[str] = []
+            if row is not None:
+                removed_files = sorted(set(name for name in (row[2] or "").split("\n") if name != "") - set(names))
+                removed_directories = sorted(set(name for name in row[1].split("\n") if name != "") - set(subdirectories))
+
+            # Files Removed After Packing (shards.py prune) Are Still Local, Their Keys Stay
+            archive = load_archive()
+            if archive is not None:
+                removed_files = [name for name in removed_files if not archive.exists(key=prefix + name)]
+
+            with self.lock:
+                # New Keys Are Added, Tracked Files Replaced On Disk Lose Their Hash So get_local_hash() Reads Them Again
+                before: int = self.connection.total_changes
+                self.connection.executemany("INSERT INTO files (key, size, fetched, mtime) VALUES (?, ?, ?, ?) "
+                                            "ON CONFLICT (key) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, fetched = excluded.fetched, hash = NULL, part_etag = NULL, other_part_size = NULL, other_part_etag = NULL "
+                                            "WHERE files.mtime IS NOT NULL AND files.mtime != excluded.mtime", files)
+                self.connection.executemany("DELETE FROM files WHERE key = ?", [(prefix + name,) for name in removed_files])
+
+                # '0' Sorts Right After '/', So This Range Is Everything Under The Removed Directory
+                for name in removed_directories:
+                    keys: list[str] = [key for (key,) in self.connection.execute("SELECT key FROM files WHERE key >= ? AND key < ?", (prefix + name + "/", prefix + name + "0"))]
+                    self.connection.executemany("DELETE FROM files WHERE key = ?", [(key,) for key in keys if archive is None or not archive.exists(key=key)])
+                    self.connection.execute("DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)", (os.path.join(path, name), os.path.join(path, name, ""), os.path.join(path, name) + chr(ord(os.path.sep) + 1)))
+
+                total += self.connection.total_changes - before
+                self.connection.execute("INSERT OR REPLACE INTO directories (path, mtime, subdirectories, files) VALUES (?, ?, ?, ?)", (path, mtime, "\n".join(subdirectories), "\n".join(names)))
+                self.commit_if_needed()
+
+            stack.extend(os.path.join(path, name) for name in subdirectories)
+
+        self.commit()
+        self.reconciled.add(root)
+        return total
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+manifest: Optional[Manifest] = None
+manifest_lock: threading.Lock = threading.Lock()
+def load_manifest() -> Manifest:
+    global manifest
+
+    with manifest_lock:
+        if manifest is None:
+            manifest = Manifest()
+            atexit.register(manifest.commit)
+
+            # First Run Against An Existing Download, Index What's Already On Disk
+            if manifest.is_empty() and os.path.exists(os.path.join("data", "local")):
+                manifest.import_tree()
+
+        return manifest
+
+if __name__ == "__main__":
+    # Picks Up Files Copied Into data/local By Hand
+    total: int = load_manifest().reconcile()
+    print("Indexed %s Files" % total)
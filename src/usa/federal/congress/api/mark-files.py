@@ -1,11 +1,10 @@
 import os
 import csv
-import json
 import time
 import datetime
 import humanize
 
-from download import scantree
+from corpus import load_reader
 
 def mark_files() -> None:
     total: int = 0
@@ -19,14 +18,9 @@ def mark_files() -> None:
         os.makedirs(os.path.join("data", "mark"))
 
     files: dict = {}
-    for file in scantree(path=os.path.join("data", "local")):
+    for file, contents in load_reader().documents(suffix=".json"):
         total += 1
 
-        fd: int = os.open(file, os.O_RDONLY)
-        data: bytes = os.read(fd, os.fstat(fd).st_size)
-        contents: dict = json.loads(data)
-        os.close(fd=fd)
-
         # Skip Custom Lists I've Made
         if type(contents) is list:
             continue
@@ -0,0 +1,142 @@
+import datetime
+
+from abc import ABC, abstractmethod
+from urllib.parse import urlencode
+from extract import iter_urls
+from typing import Any, Optional, NamedTuple
+
+
+class PageItem(NamedTuple):
+    url: str
+    update_date: Optional[str] = None  # updateDate From The List Page, When It Has One
+    parent_key: Optional[str] = None  # Defaults To The Folder get_key() Puts The URL In
+
+class Paginator(ABC):
+    """
+        How To Walk One List Endpoint
+
+        A paginator splits its endpoint into shards (independent sets of query parameters
+        that can be crawled at the same time), pages through each shard by offset and
+        pulls the downloadable items out of every page.
+    """
+    endpoint: str
+    page_size: int
+    sortable: bool  # Accepts sort=updateDate+desc
+
+    def __init__(self, endpoint: str, page_size: int = 250, sortable: bool = False) -> None:
+        self.endpoint = endpoint
+        self.page_size = page_size
+        self.sortable = sortable
+
+    def get_shards(self) -> list[dict]:
+        return [{}]
+
+    def get_name(self, shard: dict, sort: Optional[str] = None) -> str:
+        """
+            Checkpoint Name For A Shard
+        """
+        query: dict = dict(shard)
+        if sort is not None:
+            query["sort"] = sort
+
+        if len(query) == 0:
+            return self.endpoint
+
+        return "%s?%s" % (self.endpoint, urlencode(query))
+
+    def get_params(self, shard: dict, offset: int, sort: Optional[str] = None) -> dict:
+        params: dict = dict(shard)
+        params["offset"] = offset
+        params["limit"] = self.page_size
+
+        if sort is not None:
+            params["sort"] = sort
+
+        return params
+
+    @abstractmethod
+    def get_count(self, results: dict) -> Optional[int]:
+        """
+            Total Items In The Shard, None When The Page Is An Error Instead
+        """
+
+    @abstractmethod
+    def get_items(self, results: dict) -> list[PageItem]:
+        pass
+
+    def get_records(self, results: dict) -> list[tuple[str, dict]]:
+        """
+            (Key, Record) Pairs Embedded In The List Page That Have No Detail URL Of Their Own
+        """
+        return []
+
+class OffsetPaginator(Paginator):
+    """
+        The Standard api.congress.gov List Format, {"<items>": [...], "pagination": {"count": ...}}
+    """
+    def get_count(self, results: dict) -> Optional[int]:
+        if "pagination" not in results:
+            return None
+
+        return results["pagination"]["count"]
+
+    def get_items(self, results: dict) -> list[PageItem]:
+        update_dates: dict[str, str] = {}
+        for items in results.values():
+            if type(items) is not list:
+                continue
+
+            for item in items:
+                if type(item) is dict and type(item.get("url")) is str and type(item.get("updateDate")) is str:
+                    update_dates[item["url"]] = item["updateDate"]
+
+        # Don't Get Stuck In Loop, The Pagination Block Links Back To This Endpoint
+        page: dict = {name: value for name, value in results.items() if name != "pagination"}
+        return [PageItem(url=url, update_date=update_dates.get(url)) for url in iter_urls(data=page)]
+
+class CongressionalRecordPaginator(Paginator):
+    """
+        /congressional-record Wraps Its Items As {"Results": {"Issues": [...], "TotalCount": ...}}
+
+        The endpoint can be filtered by year and month (y= and m=), so every month since
+        start_year becomes its own shard and the months are crawled in parallel.
+    """
+    start_year: int
+
+    def __init__(self, endpoint: str = "https://api.congress.gov/v3/congressional-record", page_size: int = 250, start_year: int = 1995) -> None:
+        super().__init__(endpoint=endpoint, page_size=page_size, sortable=False)
+        self.start_year = start_year
+
+    def get_shards(self) -> list[dict]:
+        today: datetime.date = datetime.date.today()
+
+        shards: list[dict] = []
+        for year in range(self.start_year, today.year+1):
+            for month in range(1, 13):
+                if year == today.year and month > today.month:
+                    break
+
+                shards.append({"y": year, "m": month})
+
+        return shards
+
+    def get_count(self, results: dict) -> Optional[int]:
+        if "Results" not in results or "TotalCount" not in results["Results"]:
+            return None
+
+        return results["Results"]["TotalCount"]
+
+    def get_issue_key(self, issue: dict) -> str:
+        return "usa/federal/congress/congressional-records/%s/%s" % (issue.get("Volume", "unknown"), issue.get("Issue", issue.get("Id")))
+
+    def get_items(self, results: dict) -> list[PageItem]:
+        items: list[PageItem] = []
+        for issue in results["Results"].get("Issues", []):
+            # Each Section (Digest, House, Senate, ...) Lists Its PDFs Under "Url"
+            for url in iter_urls(data=issue.get("Links", {}), key="Url"):
+                items.append(PageItem(url=url, update_date=None, parent_key=self.get_issue_key(issue=issue)))
+
+        return items
+
+    def get_records(self, results: dict) -> list[tuple[str, Any]]:
+        return [("%s/data.json" % self.get_issue_key(issue=issue), issue) for issue in results["Results"].get("Issues", [])]
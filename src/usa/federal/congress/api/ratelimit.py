@@ -0,0 +1,124 @@
+import time
+import threading
+
+from typing import Optional, Mapping
+
+
+class KeyBucket:
+    """
+        Token Bucket For A Single API Key
+    """
+    key: str
+    limit: int  # Requests Allowed Per Window
+    window: float  # Seconds Before A Full Bucket Refills
+    tokens: float
+    updated: float
+    parked_until: float
+
+    def __init__(self, key: str, limit: int, window: float) -> None:
+        self.key = key
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.parked_until = 0
+
+    def refill(self, now: float) -> None:
+        """
+            Add Back The Tokens Earned Since The Last Refill
+        """
+        rate: float = self.limit / self.window
+        self.tokens = min(float(self.limit), self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """
+            Monotonic Time When This Key Can Send Its Next Request
+        """
+        if self.parked_until > now:
+            return self.parked_until
+
+        if self.tokens >= 1:
+            return now
+
+        rate: float = self.limit / self.window
+        return now + (1 - self.tokens) / rate
+
+    def __repr__(self) -> str:
+        return "KeyBucket(key=...%s, tokens=%.1f/%s, parked=%s)" % (self.key[-4:], self.tokens, self.limit, self.parked_until > time.monotonic())
+
+class KeyScheduler:
+    """
+        Hands Out API Keys That Still Have Hourly Budget Left
+
+        Every key gets its own token bucket, so one exhausted key is parked
+        by itself while the other keys keep serving requests.
+    """
+    buckets: list[KeyBucket]
+    condition: threading.Condition
+
+    def __init__(self, keys: list[str], limit: int = 5000, window: float = 60*60) -> None:
+        if len(keys) == 0:
+            raise ValueError('At Least One API Key Is Required')
+
+        self.buckets = [KeyBucket(key=key, limit=limit, window=window) for key in keys]
+        self.condition = threading.Condition()
+
+    def get_bucket(self, key: str) -> Optional[KeyBucket]:
+        for bucket in self.buckets:
+            if bucket.key == key:
+                return bucket
+
+        return None
+
+    def acquire(self) -> str:
+        """
+            Take A Token From The Key With The Most Budget, Waiting If Every Key Is Spent
+        """
+        with self.condition:
+            while True:
+                now: float = time.monotonic()
+                for bucket in self.buckets:
+                    bucket.refill(now=now)
+
+                available: list[KeyBucket] = [bucket for bucket in self.buckets if bucket.parked_until <= now and bucket.tokens >= 1]
+                if len(available) > 0:
+                    bucket: KeyBucket = max(available, key=lambda b: b.tokens)
+                    bucket.tokens -= 1
+                    return bucket.key
+
+                wait: float = min(bucket.ready_at(now=now) for bucket in self.buckets) - now
+                self.condition.wait(timeout=max(wait, 0.01))
+
+    def update(self, key: str, headers: Mapping[str, str]) -> None:
+        """
+            Trust The Server's Count Of Remaining Requests When It Sends One
+        """
+        remaining: Optional[str] = headers.get("X-RateLimit-Remaining")
+        limit: Optional[str] = headers.get("X-RateLimit-Limit")
+
+        with self.condition:
+            bucket: Optional[KeyBucket] = self.get_bucket(key=key)
+            if bucket is None:
+                return
+
+            if limit is not None and limit.isdigit():
+                bucket.limit = int(limit)
+
+            if remaining is not None and remaining.isdigit():
+                bucket.tokens = min(bucket.tokens, float(remaining))
+
+    def park(self, key: str, seconds: Optional[float] = None) -> None:
+        """
+            Stop Using A Key Until Its Quota Has Had Time To Reset
+        """
+        with self.condition:
+            bucket: Optional[KeyBucket] = self.get_bucket(key=key)
+            if bucket is None:
+                return
+
+            now: float = time.monotonic()
+            bucket.tokens = 0
+            bucket.updated = now
+            bucket.parked_until = now + (bucket.window if seconds is None else seconds)
+            self.condition.notify_all()
@@ -2,33 +2,29 @@ import os
 import csv
 import json
 import time
-import yaml
+import argparse
 import datetime
 import humanize
 # import pandasgui
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 
 from pandas import DataFrame
-from download import scantree
-from typing import Union, Any
+from config import load_config
+from corpus import CorpusEntry, load_reader
+from typing import Union, Any, Optional, Generator
 
 
-def process_possible_keys(file: str, possible_keys: dict) -> dict:
-    fd: int = os.open(file, os.O_RDONLY)
-    data: bytes = os.read(fd, os.fstat(fd).st_size)
-    contents: dict = json.loads(data)
-    os.close(fd=fd)
+def process_possible_keys(file: Union[str,CorpusEntry], possible_keys: dict) -> dict:
+    return update_possible_keys(contents=get_records(file=file), possible_keys=possible_keys)
 
+def update_possible_keys(contents: Union[dict,list], possible_keys: dict) -> dict:
     # Skip Custom Lists I've Made
     if type(contents) is list:
         return possible_keys
 
-    if "pagination" in contents:
-        del(contents["pagination"])
-    
-    if "request" in contents:
-        del(contents["request"])
-
     for entry in contents:
         # Skip Custom Lists I've Made (May Be Unnecessary)
         # if type(contents[entry]) is str:
@@ -60,7 +56,7 @@ def get_possible_keys() -> dict:
         os.makedirs(os.path.join("data", "local"))
 
     possible_keys: dict = {}
-    for file in scantree(path=os.path.join("data", "local")):
+    for file in load_reader().entries(suffix=".json"):
         total += 1
 
         possible_keys = process_possible_keys(possible_keys=possible_keys, file=file)
@@ -75,11 +71,15 @@ def get_possible_keys() -> dict:
 
     return possible_keys
 
-def get_records(file: str) -> dict:
-    fd: int = os.open(file, os.O_RDONLY)
-    data: bytes = os.read(fd, os.fstat(fd).st_size)
-    contents: dict = json.loads(data)
-    os.close(fd=fd)
+def get_records(file: Union[str,CorpusEntry]) -> dict:
+    try:
+        contents: dict = load_reader().load(entry=file)
+    except FileNotFoundError:
+        if type(file) is CorpusEntry and file.record is not None:
+            raise
+
+        # Deleted Since The Manifest Last Saw It, Nothing To Read
+        return {}
 
     if "pagination" in contents:
         del(contents["pagination"])
@@ -98,7 +98,7 @@ def get_dataframes(possible_keys: dict) -> dict:
         os.makedirs(os.path.join("data", "local"))
 
     records: dict = {}
-    for file in scantree(path=os.path.join("data", "local")):
+    for file in load_reader().entries(suffix=".json"):
         total += 1
 
         # TODO: Determine if should change name to be less confusing
@@ -130,7 +130,7 @@ def get_dataframes(possible_keys: dict) -> dict:
     start: float = time.time()
     elapsed: str = humanize.naturaldelta(0)
     dataframes: dict = {}
-    for record in records.keys():
+    for record in list(records.keys()):
         dataframes[record] = pd.DataFrame.from_records(data=records[record], columns=possible_keys[record])
         dataframes[record].name = record
         del records[record]  # Delete Record Key (To Save RAM)
@@ -144,24 +144,270 @@ def get_dataframes(possible_keys: dict) -> dict:
 
     return dataframes
 
-def get_database() -> Union[str, Any]:
-    with open(os.path.join("data", "config.yml"), 'r') as fi:
-        config: dict = yaml.safe_load(fi)
-    
-    if "database" not in config:
-        raise KeyError('Missing Database Section From Config')
-    elif "url" not in config["database"]:
-        raise KeyError('Missing url Section From Config["database"]')
-    
-    url: str = config["database"]["url"]
+def iter_records(contents: Union[dict,list]) -> Generator[tuple[str, dict], None, None]:
+    """
+        (Entity, Record) Pairs From A File's Records, The Same Rows get_dataframes() Collects
+    """
+    # Skip Custom Lists I've Made
+    if type(contents) is list:
+        return
 
-    return url
+    for entry in contents:
+        if type(contents[entry]) is dict:
+            yield entry, contents[entry]
+        elif type(contents[entry]) is list:
+            for subentry in contents[entry]:
+                # Columns Only Come From Dicts, See process_possible_keys()
+                if type(subentry) is dict:
+                    yield entry, subentry
+
+def to_string(value: Any) -> Optional[str]:
+    if value is None or type(value) is str:
+        return value
+
+    # Nested Objects And Lists Are Kept As JSON So Nothing Is Lost
+    return json.dumps(value)
+
+class EntityWriter:
+    """
+        Streams One Entity's Records To A Parquet Or Arrow IPC File In Batches
+
+        Only batch_size rows are held in memory at a time. Every column is a string,
+        the API isn't consistent enough about types to trust any other choice.
+    """
+    path: str
+    columns: list[str]
+    schema: pa.Schema
+    batch_size: int
+    rows: list[dict]
+    writer: Union[pq.ParquetWriter, ipc.RecordBatchFileWriter]
+    total: int
+
+    def __init__(self, path: str, columns: list[str], format: str = "parquet", batch_size: int = 10000) -> None:
+        self.path = path
+        self.columns = columns
+        self.schema = pa.schema([pa.field(column, pa.string()) for column in columns])
+        self.batch_size = batch_size
+        self.rows = []
+        self.total = 0
+
+        if format == "parquet":
+            self.writer = pq.ParquetWriter(where=path, schema=self.schema, compression="zstd")
+        elif format == "arrow":
+            self.writer = ipc.new_file(sink=path, schema=self.schema)
+        else:
+            raise ValueError("Unknown Format %s, Expected parquet Or arrow" % format)
+
+    def write(self, record: dict) -> None:
+        self.rows.append(record)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.rows) == 0:
+            return
+
+        arrays: list[pa.Array] = [pa.array([to_string(row.get(column)) for row in self.rows], type=pa.string()) for column in self.columns]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+        self.total += len(self.rows)
+        self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+def widen_part(path: str, columns: list[str], format: str = "parquet") -> None:
+    """
+        Rewrite A Part Batch By Batch With Every Column In columns, Missing Ones Filled With Nulls
+    """
+    schema: pa.Schema = pa.schema([pa.field(column, pa.string()) for column in columns])
+    temp: str = "%s.tmp" % path
+
+    def widen(batch: pa.RecordBatch) -> pa.RecordBatch:
+        arrays: list[pa.Array] = [batch.column(column) if column in batch.schema.names else pa.nulls(batch.num_rows, type=pa.string()) for column in columns]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    if format == "parquet":
+        source: pq.ParquetFile = pq.ParquetFile(path)
+        try:
+            with pq.ParquetWriter(where=temp, schema=schema, compression="zstd") as writer:
+                for batch in source.iter_batches():
+                    writer.write_batch(widen(batch=batch))
+        finally:
+            source.close()
+    else:
+        with pa.memory_map(path) as mapped:
+            reader: ipc.RecordBatchFileReader = ipc.open_file(mapped)
+            with ipc.new_file(sink=temp, schema=schema) as writer:
+                for index in range(reader.num_record_batches):
+                    writer.write_batch(widen(batch=reader.get_batch(index)))
+
+    os.replace(temp, path)
+
+class PartitionedWriter:
+    """
+        Streams One Entity's Records Into data/<format>/<entity>/part-NNNNN.<format> Without Knowing Its Columns Up Front
+
+        columns is the entity's live set from possible_keys. It's read when a batch is
+        written, so keys that show up while rows are buffered just widen that batch.
+        Once a part is open its schema is fixed, so a wider batch starts a new part, and
+        on close every narrower part is rewritten to the final columns so readers of the
+        whole directory see one schema.
+    """
+    directory: str
+    entity: str
+    format: str
+    batch_size: int
+    columns: set
+    rows: list[dict]
+    writer: Optional[EntityWriter]
+    parts: int
+    written: list[tuple[str, list[str]]]  # (Path, Columns) Of Every Part So Far
+    total: int
+
+    def __init__(self, directory: str, entity: str, columns: set, format: str = "parquet", batch_size: int = 10000) -> None:
+        self.directory = os.path.join(directory, entity)
+        self.entity = entity
+        self.format = format
+        self.batch_size = batch_size
+        self.columns = columns
+        self.rows = []
+        self.writer = None
+        self.parts = 0
+        self.written = []
+        self.total = 0
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        # Parts Left By An Earlier Run Would Be Read Back As Part Of This One
+        for name in os.listdir(self.directory):
+            if name.startswith("part-") and name.endswith("." + format):
+                os.remove(os.path.join(self.directory, name))
+
+    def write(self, record: dict) -> None:
+        self.rows.append(record)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.rows) == 0:
+            return
+
+        if self.writer is None or len(self.writer.columns) != len(self.columns):
+            if self.writer is not None:
+                self.writer.close()
+
+            path: str = os.path.join(self.directory, "part-%05d.%s" % (self.parts, self.format))
+            self.writer = EntityWriter(path=path, columns=sorted(self.columns), format=self.format, batch_size=len(self.rows)+1)
+            self.written.append((path, self.writer.columns))
+            self.parts += 1
+
+        for row in self.rows:
+            self.writer.write(record=row)
+        self.writer.flush()
+
+        self.total += len(self.rows)
+        self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+        columns: list[str] = sorted(self.columns)
+        for path, part_columns in self.written:
+            if part_columns != columns:
+                widen_part(path=path, columns=columns, format=self.format)
+
+def export_records_single_pass(format: str = "parquet", batch_size: int = 10000) -> dict:
+    """
+        Discover The Schema While Exporting, Each File Is Read And Parsed Once
+
+        Returns possible_keys, the same columns get_possible_keys() would have found.
+    """
+    total: int = 0
+    start: float = time.time()
+    elapsed: str = humanize.naturaldelta(0)
+
+    directory: str = os.path.join("data", format)
+    possible_keys: dict = {}
+    writers: dict[str, PartitionedWriter] = {}
+    try:
+        for file in load_reader().entries(suffix=".json"):
+            total += 1
+
+            contents: Union[dict,list] = get_records(file=file)
+            update_possible_keys(contents=contents, possible_keys=possible_keys)
+
+            for entity, record in iter_records(contents=contents):
+                if entity not in writers:
+                    writers[entity] = PartitionedWriter(directory=directory, entity=entity, columns=possible_keys[entity], format=format, batch_size=batch_size)
+
+                writers[entity].write(record=record)
+
+            if total % 1000 == 0:
+                current: float = time.time()
+                elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(current-start)))
+                print("\033[K(Export) Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    print("\033[K(Export) Total Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\n")
+    for entity, writer in writers.items():
+        print("%s: %s Rows In %s Parts" % (writer.directory, humanize.intcomma(writer.total), humanize.intcomma(writer.parts)), end="\n")
+    print("-"*40, end="\n")
+
+    return possible_keys
+
+def export_records(possible_keys: dict, format: str = "parquet", batch_size: int = 10000) -> dict:
+    """
+        Stream Every Record Into One File Per Entity (data/<format>/<entity>.<format>), Returns Rows Written Per Entity
+    """
+    total: int = 0
+    start: float = time.time()
+    elapsed: str = humanize.naturaldelta(0)
+
+    directory: str = os.path.join("data", format)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    writers: dict[str, EntityWriter] = {}
+    try:
+        for file in load_reader().entries(suffix=".json"):
+            total += 1
+
+            for entity, record in iter_records(contents=get_records(file=file)):
+                if entity not in writers:
+                    writers[entity] = EntityWriter(path=os.path.join(directory, "%s.%s" % (entity, format)), columns=sorted(possible_keys[entity]), format=format, batch_size=batch_size)
+
+                writers[entity].write(record=record)
+
+            if total % 1000 == 0:
+                current: float = time.time()
+                elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(current-start)))
+                print("\033[K(Export) Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    print("\033[K(Export) Total Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\n")
+    for entity, writer in writers.items():
+        print("%s: %s Rows" % (writer.path, humanize.intcomma(writer.total)), end="\n")
+    print("-"*40, end="\n")
+
+    return {entity: writer.total for entity, writer in writers.items()}
+
+def get_database() -> Union[str, Any]:
+    return load_config().get_database()
 
 def save_dataframes(delete_after_save: bool = False, **kwargs: DataFrame) -> None:
     if not os.path.exists(os.path.join("data", "csv")):
         os.makedirs(os.path.join("data", "csv"))
 
-    for kwarg in kwargs:
+    for kwarg in list(kwargs.keys()):
         if type(kwargs[kwarg]) is not DataFrame:
             print("Found argument of type: `%s`, Skipping..." % type(kwargs[kwarg]))
             continue
@@ -185,20 +431,35 @@ def read_sql() -> DataFrame:
     return pd.read_sql(sql='select * from bills;', con=get_database())
 
 if __name__ == "__main__":
-    possible_keys: dict = get_possible_keys()  # Get Possible Keys
-    save_possible_keys(possible_keys=possible_keys)  # Save Possible Keys To File For Debugging
-
-    # TODO: Consider Only Loading One DataFrame At A Time
-    dataframes: dict = get_dataframes(possible_keys=possible_keys)  # Get DataFrames
-    del possible_keys  # Delete Possible Keys (To Save RAM)
-
-    save_dataframes(**dataframes, delete_after_save=True)  # Save DataFrames To File For Debugging
-    # pandasgui.show(**dataframes)  # Show DataFrames To User
-
-    # df: DataFrame = read_sql()
-
-    # print(df)
-    # for row in df.iterrows():
-    #     print(row)
-
-    # pandasgui.show(df)
\ No newline at end of file
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Export Local Congress.gov Data To One File Per Entity")
+    parser.add_argument("--format", choices=["parquet", "arrow", "csv"], default="parquet", help="csv loads every entity into memory, parquet and arrow stream in batches")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows held in memory per entity before they're written (parquet and arrow only)")
+    parser.add_argument("--two-pass", action="store_true", help="Find every column first and write one file per entity instead of part files (parquet and arrow only)")
+    args: argparse.Namespace = parser.parse_args()
+
+    if args.format != "csv" and not args.two_pass:
+        possible_keys: dict = export_records_single_pass(format=args.format, batch_size=args.batch_size)
+        save_possible_keys(possible_keys=possible_keys)  # Save Possible Keys To File For Debugging
+    elif args.format != "csv":
+        possible_keys: dict = get_possible_keys()  # Get Possible Keys
+        save_possible_keys(possible_keys=possible_keys)  # Save Possible Keys To File For Debugging
+
+        export_records(possible_keys=possible_keys, format=args.format, batch_size=args.batch_size)
+    else:
+        possible_keys: dict = get_possible_keys()  # Get Possible Keys
+        save_possible_keys(possible_keys=possible_keys)  # Save Possible Keys To File For Debugging
+
+        # TODO: Consider Only Loading One DataFrame At A Time
+        dataframes: dict = get_dataframes(possible_keys=possible_keys)  # Get DataFrames
+        del possible_keys  # Delete Possible Keys (To Save RAM)
+
+        save_dataframes(**dataframes, delete_after_save=True)  # Save DataFrames To File For Debugging
+        # pandasgui.show(**dataframes)  # Show DataFrames To User
+
+        # df: DataFrame = read_sql()
+
+        # print(df)
+        # for row in df.iterrows():
+        #     print(row)
+
+        # pandasgui.show(df)
\ No newline at end of file
@@ -0,0 +1,187 @@
+import os
+import time
+import atexit
+import random
+import sqlite3
+import threading
+
+from enum import Enum
+from typing import Optional, NamedTuple
+
+
+class Failure(Enum):
+    RATE_LIMIT = "rate_limit"  # Key Is Out Of Requests, Retry With Another Key
+    TRANSIENT = "transient"  # 5xx, Timeouts, Dropped Connections, Truncated Bodies
+    PERMANENT = "permanent"  # 4xx, Django "No Object Matches The Given Query", Bugs
+
+class DownloadError(Exception):
+    failure: Failure
+    status: Optional[int]
+    message: str
+
+    def __init__(self, failure: Failure, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.failure = failure
+        self.status = status
+        self.message = message
+
+def classify_status(status: int, error: Optional[dict] = None, keyed: bool = True) -> Failure:
+    """
+        keyed is whether the request carried an API key. Without one there's no key to park,
+        so a 429 is just another transient failure that uses up an attempt.
+    """
+    code: Optional[str] = error.get("code") if type(error) is dict else None
+
+    # api.data.gov Answers {"error": {"code": "OVER_RATE_LIMIT", "message": ...}} When A Key Runs Out
+    if status == 429 or code == "OVER_RATE_LIMIT":
+        return Failure.RATE_LIMIT if keyed else Failure.TRANSIENT
+
+    # Every Other Coded Error (API_KEY_INVALID, API_KEY_DISABLED, ...) Fails The Same Way Every Time
+    if code is not None:
+        return Failure.PERMANENT
+
+    if status == 408 or status >= 500:
+        return Failure.TRANSIENT
+
+    return Failure.PERMANENT
+
+def classify_exception(exception: BaseException) -> Failure:
+    # Imported Here So This Module Stays Usable Without requests
+    from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError
+    from json import JSONDecodeError
+
+    if isinstance(exception, DownloadError):
+        return exception.failure
+
+    if isinstance(exception, (ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError, JSONDecodeError)):
+        return Failure.TRANSIENT
+
+    return Failure.PERMANENT
+
+class RetryPolicy:
+    """
+        Exponential Backoff With Full Jitter
+
+        The nth retry waits a random time between 0 and min(max_delay, base_delay * 2^n),
+        so workers that failed together don't all come back at the same moment.
+    """
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def should_retry(self, failure: Failure, attempt: int) -> bool:
+        if failure is Failure.PERMANENT:
+            return False
+
+        # Running Out Of Requests Isn't The URL's Fault, So It Doesn't Use Up Attempts
+        if failure is Failure.RATE_LIMIT:
+            return True
+
+        return attempt < self.max_attempts
+
+class RetryItem(NamedTuple):
+    url: str
+    parent_key: str
+    update_date: Optional[str]
+    refresh: bool
+    attempt: int
+    failure: str
+    message: Optional[str]
+    next_attempt: float
+
+class RetryQueue:
+    """
+        Durable Queue Of URLs Waiting To Be Retried, Stored In data/retry.db
+
+        Rows stay in the queue while they're being retried, so a crash mid-retry
+        leaves them to be picked up by the next run.
+    """
+    path: str
+    connection: sqlite3.Connection
+    lock: threading.RLock
+
+    def __init__(self, path: str = os.path.join("data", "retry.db")) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+
+        directory: str = os.path.dirname(path) or "."
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS retries (
+                url TEXT PRIMARY KEY,
+                parent_key TEXT NOT NULL,
+                update_date TEXT,
+                refresh INTEGER NOT NULL DEFAULT 0,
+                attempt INTEGER NOT NULL DEFAULT 0,
+                failure TEXT NOT NULL,
+                message TEXT,
+                next_attempt REAL NOT NULL,
+                leased INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS retries_next_attempt ON retries (leased, next_attempt)")
+
+        # Anything Still Leased Belonged To A Run That Didn't Finish
+        self.connection.execute("UPDATE retries SET leased = 0")
+        self.connection.commit()
+
+    def push(self, url: str, parent_key: str, update_date: Optional[str], refresh: bool, attempt: int, failure: Failure, message: Optional[str], delay: float) -> None:
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO retries (url, parent_key, update_date, refresh, attempt, failure, message, next_attempt, leased) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                                    (url, parent_key, update_date, int(refresh), attempt, failure.value, message, time.time()+delay))
+            self.connection.commit()
+
+    def take_due(self, limit: int = 1000) -> list[RetryItem]:
+        """
+            Lease Up To limit Rows Whose Backoff Has Passed
+        """
+        with self.lock:
+            rows: list[tuple] = self.connection.execute("SELECT url, parent_key, update_date, refresh, attempt, failure, message, next_attempt FROM retries WHERE leased = 0 AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                                                        (time.time(), limit)).fetchall()
+            self.connection.executemany("UPDATE retries SET leased = 1 WHERE url = ?", [(row[0],) for row in rows])
+            self.connection.commit()
+
+        return [RetryItem(url=row[0], parent_key=row[1], update_date=row[2], refresh=bool(row[3]), attempt=row[4], failure=row[5], message=row[6], next_attempt=row[7]) for row in rows]
+
+    def next_due(self) -> Optional[float]:
+        with self.lock:
+            row: Optional[tuple] = self.connection.execute("SELECT MIN(next_attempt) FROM retries WHERE leased = 0").fetchone()
+
+        return row[0] if row is not None else None
+
+    def remove(self, url: str) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM retries WHERE url = ?", (url,))
+            self.connection.commit()
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM retries").fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+retry_queue: Optional[RetryQueue] = None
+retry_queue_lock: threading.Lock = threading.Lock()
+def load_retry_queue() -> RetryQueue:
+    global retry_queue
+
+    with retry_queue_lock:
+        if retry_queue is None:
+            retry_queue = RetryQueue()
+            atexit.register(retry_queue.close)
+
+        return retry_queue
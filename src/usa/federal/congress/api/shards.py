@@ -0,0 +1,434 @@
+import os
+import sys
+import mmap
+import time
+import zlib
+import struct
+import sqlite3
+import argparse
+import datetime
+import threading
+import humanize
+
+from walker import walk
+from typing import BinaryIO, Optional, Generator, NamedTuple
+
+
+# Record Header: Magic, Key Length, Body Length, CRC32 Of The Body, Followed By The Key Then The Body
+RECORD_MAGIC: bytes = b"CRS1"
+RECORD_HEADER: struct.Struct = struct.Struct("<4sIQI")
+
+class ShardRecord(NamedTuple):
+    key: str
+    segment: int
+    offset: int  # Where The Body Starts In The Segment
+    size: int
+    crc: int
+    packed: Optional[float] = None  # When It Was Written, A Manifest Entry Newer Than This Means The Copy On Disk Replaced It
+
+class ShardArchive:
+    """
+        Append-Only Packed Archive Of The data/local Tree
+
+        Records are appended to large segment files (data/shards/segment-000001.pack, ...)
+        and indexed by their get_key() path in data/shards/index.db. Writing a key again
+        appends a new record and points the index at it, older copies stay in the segment
+        until it's rewritten. Bodies are stored exactly as they would be on disk, so
+        compressed files stay compressed. A key downloaded again after it was packed is
+        left to the copy on disk until the next import packs it.
+    """
+    root: str
+    segment_size: int
+    connection: sqlite3.Connection
+    lock: threading.RLock
+    writer: Optional[BinaryIO]
+    writer_segment: int
+    maps: dict[int, tuple[int, mmap.mmap]]  # Segment -> (Mapped Size, Map)
+    pending: int
+    batch: int
+
+    def __init__(self, root: str = os.path.join("data", "shards"), segment_size: int = 1024*1024*1024, batch: int = 1024) -> None:
+        self.root = root
+        self.segment_size = segment_size
+        self.batch = batch
+        self.pending = 0
+        self.lock = threading.RLock()
+        self.writer = None
+        self.writer_segment = 0
+        self.maps = {}
+
+        if not os.path.exists(root):
+            os.makedirs(root)
+
+        self.connection = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                key TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                crc INTEGER NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_position ON records (segment, offset)")
+
+        # Added So Newer Downloads Win Over Packed Copies, Older Indexes Get The Column On First Open
+        if "packed" not in [row[1] for row in self.connection.execute("PRAGMA table_info(records)")]:
+            self.connection.execute("ALTER TABLE records ADD COLUMN packed REAL")
+
+        self.connection.commit()
+
+    def get_segment_path(self, segment: int) -> str:
+        return os.path.join(self.root, "segment-%06d.pack" % segment)
+
+    def get_segments(self) -> list[int]:
+        segments: list[int] = []
+        for name in os.listdir(self.root):
+            if name.startswith("segment-") and name.endswith(".pack"):
+                segments.append(int(name[len("segment-"):-len(".pack")]))
+
+        return sorted(segments)
+
+    def open_writer(self, size: int) -> BinaryIO:
+        """
+            The Newest Segment, Or A New One If Appending size Bytes Would Overflow It
+        """
+        if self.writer is None:
+            segments: list[int] = self.get_segments()
+            self.writer_segment = segments[-1] if len(segments) > 0 else 1
+            self.writer = open(self.get_segment_path(segment=self.writer_segment), mode="ab")
+
+        # A Record Bigger Than segment_size Still Gets A Segment To Itself
+        if self.writer.tell() > 0 and self.writer.tell() + size > self.segment_size:
+            self.writer.close()
+            self.writer_segment += 1
+            self.writer = open(self.get_segment_path(segment=self.writer_segment), mode="ab")
+
+        return self.writer
+
+    def put(self, key: str, body: bytes) -> ShardRecord:
+        encoded: bytes = key.encode()
+        crc: int = zlib.crc32(body)
+
+        with self.lock:
+            writer: BinaryIO = self.open_writer(size=RECORD_HEADER.size + len(encoded) + len(body))
+            start: int = writer.tell()
+            writer.write(RECORD_HEADER.pack(RECORD_MAGIC, len(encoded), len(body), crc))
+            writer.write(encoded)
+            writer.write(body)
+
+            record: ShardRecord = ShardRecord(key=key, segment=self.writer_segment, offset=start + RECORD_HEADER.size + len(encoded), size=len(body), crc=crc, packed=time.time())
+            self.connection.execute("INSERT OR REPLACE INTO records (key, segment, offset, size, crc, packed) VALUES (?, ?, ?, ?, ?, ?)", record)
+
+            self.pending += 1
+            if self.pending >= self.batch:
+                self.commit()
+
+            return record
+
+    def commit(self) -> None:
+        """
+            Segment Data Reaches Disk Before The Index Points At It
+        """
+        with self.lock:
+            if self.writer is not None:
+                self.writer.flush()
+                os.fsync(self.writer.fileno())
+
+            self.connection.commit()
+            self.pending = 0
+
+    def get_record(self, key: str) -> Optional[ShardRecord]:
+        with self.lock:
+            row: Optional[tuple] = self.connection.execute("SELECT key, segment, offset, size, crc, packed FROM records WHERE key = ?", (key,)).fetchone()
+
+        return ShardRecord(*row) if row is not None else None
+
+    def exists(self, key: str) -> bool:
+        return self.get_record(key=key) is not None
+
+    def get_map(self, segment: int, end: int) -> mmap.mmap:
+        """
+            Read-Only Map Of A Segment, Remapped Once It Has Grown Past end
+        """
+        with self.lock:
+            if segment in self.maps and self.maps[segment][0] >= end:
+                return self.maps[segment][1]
+
+            # Anything Written Since The Last Map Has To Be Flushed Before It's Visible
+            if self.writer is not None and segment == self.writer_segment:
+                self.writer.flush()
+
+            with open(self.get_segment_path(segment=segment), mode="rb") as f:
+                mapped: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            # Old Maps Are Left For The Garbage Collector, A memoryview Handed Out Earlier May Still Use One
+            self.maps[segment] = (len(mapped), mapped)
+            return mapped
+
+    def read(self, record: ShardRecord) -> memoryview:
+        """
+            Zero-Copy View Of A Record's Body, Valid Until The Archive Is Closed
+        """
+        mapped: mmap.mmap = self.get_map(segment=record.segment, end=record.offset + record.size)
+        return memoryview(mapped)[record.offset:record.offset + record.size]
+
+    def get(self, key: str) -> Optional[bytes]:
+        record: Optional[ShardRecord] = self.get_record(key=key)
+        if record is None:
+            return None
+
+        return bytes(self.read(record=record))
+
+    def records(self, suffix: str = ".json", manifest: Optional[str] = None) -> Generator[ShardRecord, None, None]:
+        """
+            Every Current Record In Segment Order, So A Full Scan Reads Each Segment Front To Back
+
+            With manifest (the path to manifest.db), records whose key was saved again since
+            it was packed are left out, Manifest.keys(exclude=...) hands those out instead.
+        """
+        self.commit()
+
+        # Separate Connection So Writes Can Continue While This Is Being Read
+        reader: sqlite3.Connection = sqlite3.connect(os.path.join(self.root, "index.db"))
+        try:
+            if manifest is None:
+                cursor: sqlite3.Cursor = reader.execute("SELECT key, segment, offset, size, crc, packed FROM records WHERE key LIKE ? ORDER BY segment, offset", ("%" + suffix,))
+            else:
+                reader.execute("ATTACH DATABASE ? AS manifest", (manifest,))
+                cursor: sqlite3.Cursor = reader.execute("SELECT key, segment, offset, size, crc, packed FROM records WHERE key LIKE ? AND NOT EXISTS "
+                                                        "(SELECT 1 FROM manifest.files WHERE files.key = records.key AND IFNULL(COALESCE(files.mtime, files.fetched) > records.packed, 0)) "
+                                                        "ORDER BY segment, offset", ("%" + suffix,))
+            for row in cursor:
+                yield ShardRecord(*row)
+        finally:
+            reader.close()
+
+    def keys(self, suffix: str = ".json") -> Generator[str, None, None]:
+        for record in self.records(suffix=suffix):
+            yield record.key
+
+    def count(self, suffix: str = ".json") -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM records WHERE key LIKE ?", ("%" + suffix,)).fetchone()[0]
+
+    def verify(self, record: ShardRecord) -> bool:
+        return zlib.crc32(self.read(record=record)) == record.crc
+
+    def scan_segment(self, segment: int) -> Generator[ShardRecord, None, None]:
+        """
+            Walk A Segment's Record Headers, Stops At A Torn Write From A Crash
+        """
+        path: str = self.get_segment_path(segment=segment)
+        if os.path.getsize(path) == 0:
+            return
+
+        mapped: mmap.mmap = self.get_map(segment=segment, end=os.path.getsize(path))
+        position: int = 0
+        while position + RECORD_HEADER.size <= len(mapped):
+            magic, key_size, body_size, crc = RECORD_HEADER.unpack_from(mapped, position)
+            start: int = position + RECORD_HEADER.size + key_size
+            if magic != RECORD_MAGIC or start + body_size > len(mapped):
+                break
+
+            key: str = bytes(mapped[position + RECORD_HEADER.size:start]).decode()
+            yield ShardRecord(key=key, segment=segment, offset=start, size=body_size, crc=crc)
+            position = start + body_size
+
+    def rebuild_index(self) -> int:
+        """
+            Recreate index.db From The Segments, Later Records Win Like They Do When Writing
+
+            Record headers don't carry a time, so each record is dated by its segment's mtime.
+        """
+        total: int = 0
+        with self.lock:
+            self.connection.execute("DELETE FROM records")
+            for segment in self.get_segments():
+                packed: float = os.path.getmtime(self.get_segment_path(segment=segment))
+                for record in self.scan_segment(segment=segment):
+                    self.connection.execute("INSERT OR REPLACE INTO records (key, segment, offset, size, crc, packed) VALUES (?, ?, ?, ?, ?, ?)", record._replace(packed=packed))
+                    total += 1
+
+            self.connection.commit()
+
+        return total
+
+    def import_tree(self, root: str = os.path.join("data", "local"), suffix: str = ".json", skip_existing: bool = True) -> int:
+        """
+            Pack Every File Under root, Keyed By Its Path Relative To root
+
+            Files not modified since they were packed are skipped without being read, the rest
+            are only appended again when their CRC32 changed. Refreshed API JSON is often the
+            same length as before, so size alone can't tell.
+        """
+        total: int = 0
+        start: float = time.time()
+        for entry in walk(path=root, suffix=suffix):
+            key: str = os.path.relpath(entry.path, root).replace(os.path.sep, "/")
+            record: Optional[ShardRecord] = self.get_record(key=key) if skip_existing else None
+            if record is not None and record.size == entry.size and record.packed is not None and entry.mtime <= record.packed:
+                continue
+
+            with open(entry.path, mode="rb") as f:
+                body: bytes = f.read()
+
+            if record is not None and record.size == len(body) and record.crc == zlib.crc32(body):
+                continue
+
+            self.put(key=key, body=body)
+
+            total += 1
+            if total % 1000 == 0:
+                elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start)))
+                print("\033[KPacked Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+
+        self.commit()
+        return total
+
+    def remove_sources(self, root: str = os.path.join("data", "local"), suffix: str = ".json") -> int:
+        """
+            Delete Loose Files Whose Exact Bytes Are Already Packed
+
+            This is what frees the inodes, the manifest and uploads read a removed key from
+            its record. Files changed since they were packed are kept for the next import.
+            Empty directories left behind are removed too.
+        """
+        self.commit()
+
+        total: int = 0
+        start: float = time.time()
+        repacked: list[tuple[float, str]] = []
+        for record in self.records(suffix=suffix):
+            file: str = os.path.join(root, record.key)
+            try:
+                stat: os.stat_result = os.stat(file)
+            except FileNotFoundError:
+                continue
+
+            if stat.st_size != record.size:
+                continue
+
+            # Touched Since Packing, Only Safe To Drop When The Bytes Still Match
+            if record.packed is None or stat.st_mtime > record.packed:
+                with open(file, mode="rb") as f:
+                    if zlib.crc32(f.read()) != record.crc:
+                        continue
+
+                repacked.append((time.time(), record.key))
+
+            os.remove(file)
+
+            path: str = os.path.dirname(file)
+            while os.path.abspath(path) != os.path.abspath(root):
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    break
+
+                path = os.path.dirname(path)
+
+            total += 1
+            if total % 1000 == 0:
+                elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start)))
+                print("\033[KRemoved Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+
+        # The Record Now Stands For The Newer Copy, So It Isn't Treated As Superseded By It
+        with self.lock:
+            self.connection.executemany("UPDATE records SET packed = ? WHERE key = ?", repacked)
+            self.connection.commit()
+
+        return total
+
+    def export_tree(self, root: str = os.path.join("data", "local"), suffix: str = ".json", overwrite: bool = False) -> int:
+        """
+            Write Every Record Back Out To The Directory Layout
+        """
+        total: int = 0
+        start: float = time.time()
+        for record in self.records(suffix=suffix):
+            file: str = os.path.join(root, record.key)
+            if not overwrite and os.path.exists(file):
+                continue
+
+            path: str = os.path.dirname(file)
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+            with open(file, mode="wb") as f:
+                f.write(self.read(record=record))
+
+            total += 1
+            if total % 1000 == 0:
+                elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start)))
+                print("\033[KUnpacked Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+
+        return total
+
+    def close(self) -> None:
+        with self.lock:
+            self.commit()
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+            self.maps = {}
+            self.connection.close()
+
+archive: Optional[ShardArchive] = None
+archive_lock: threading.Lock = threading.Lock()
+def load_archive() -> Optional[ShardArchive]:
+    """
+        The Shared Archive, Or None When data/shards Hasn't Been Created
+    """
+    global archive
+
+    with archive_lock:
+        if archive is None and os.path.exists(os.path.join("data", "shards", "index.db")):
+            archive = ShardArchive()
+
+        return archive
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Pack data/local Into Shard Segments, Or Unpack Them")
+    parser.add_argument("command", choices=["import", "export", "prune", "stats", "verify", "rebuild"])
+    parser.add_argument("--root", default=os.path.join("data", "local"), help="Directory layout to import from or export to")
+    parser.add_argument("--suffix", default=".json", help="Only files ending in this (use \"\" for every file)")
+    parser.add_argument("--segment-size", type=int, default=1024, help="Segment size in MiB")
+    parser.add_argument("--overwrite", action="store_true", help="Export over files that already exist")
+    args: argparse.Namespace = parser.parse_args()
+
+    shards: ShardArchive = ShardArchive(segment_size=args.segment_size*1024*1024)
+    start: float = time.time()
+
+    if args.command == "import":
+        total: int = shards.import_tree(root=args.root, suffix=args.suffix)
+        print("\033[KPacked %s Files" % humanize.intcomma(total), end="\n")
+    elif args.command == "export":
+        total: int = shards.export_tree(root=args.root, suffix=args.suffix, overwrite=args.overwrite)
+        print("\033[KUnpacked %s Files" % humanize.intcomma(total), end="\n")
+    elif args.command == "prune":
+        total: int = shards.remove_sources(root=args.root, suffix=args.suffix)
+        print("\033[KRemoved %s Packed Files" % humanize.intcomma(total), end="\n")
+    elif args.command == "rebuild":
+        total: int = shards.rebuild_index()
+        print("Indexed %s Records" % humanize.intcomma(total))
+    elif args.command == "verify":
+        bad: int = 0
+        for record in shards.records(suffix=args.suffix):
+            if not shards.verify(record=record):
+                bad += 1
+                print("\033[KCorrupt Record: %s" % record.key, end="\n")
+
+        print("%s Corrupt Records" % humanize.intcomma(bad))
+        if bad > 0:
+            shards.close()
+            sys.exit(1)
+    else:
+        size: int = sum(os.path.getsize(shards.get_segment_path(segment=segment)) for segment in shards.get_segments())
+        print("Records: %s\tSegments: %s\tSize: %s" % (humanize.intcomma(shards.count(suffix=args.suffix)), humanize.intcomma(len(shards.get_segments())), humanize.naturalsize(size)))
+
+    shards.close()
+    print("Elapsed: %s" % humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start))))
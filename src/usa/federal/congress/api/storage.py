@@ -0,0 +1,64 @@
+import gzip
+
+from typing import Optional, Union
+
+try:
+    import zstandard  # Optional, Only Needed For storage.compression: zstd Or Reading zstd Files
+except ImportError:
+    zstandard = None
+
+
+GZIP_MAGIC: bytes = b"\x1f\x8b"
+ZSTD_MAGIC: bytes = b"\x28\xb5\x2f\xfd"
+
+compressions: list[str] = ["none", "gzip", "zstd"]
+
+def get_encoding(data: Union[bytes,bytearray,memoryview]) -> Optional[str]:
+    """
+        Detect Compression From The First Bytes, JSON Never Starts With Either Magic Number
+    """
+    # Sliced And Copied So bytearray And memoryview Buffers Work Too
+    magic: bytes = bytes(data[:4])
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+
+    if magic.startswith(ZSTD_MAGIC):
+        return "zstd"
+
+    return None
+
+def compress(data: Union[str,bytes], compression: str = "none", level: Optional[int] = None) -> tuple[bytes, Optional[str]]:
+    """
+        Returns The Stored Bytes And Their Content-Encoding (None When Stored As-Is)
+    """
+    raw: bytes = data.encode() if type(data) is str else data # type: ignore
+
+    if compression == "none":
+        return raw, None
+
+    if compression == "gzip":
+        # mtime=0 Keeps The Output (And Its md5) The Same For The Same Input
+        return gzip.compress(raw, compresslevel=6 if level is None else level, mtime=0), "gzip"
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("storage.compression Is zstd But The zstandard Package Isn't Installed")
+
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(raw), "zstd"
+
+    raise ValueError("Unknown Compression %s, Expected One Of %s" % (compression, ", ".join(compressions)))
+
+def decompress(data: Union[bytes,bytearray,memoryview]) -> Union[bytes,bytearray,memoryview]:
+    encoding: Optional[str] = get_encoding(data=data)
+
+    if encoding == "gzip":
+        return gzip.decompress(data)
+
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ImportError("Found A zstd Compressed File But The zstandard Package Isn't Installed")
+
+        # Streamed, Frames Written Without A Content Size Can't Be Decompressed In One Call
+        return zstandard.ZstdDecompressor().decompressobj().decompress(bytes(data))
+
+    return data
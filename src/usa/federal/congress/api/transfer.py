@@ -0,0 +1,203 @@
+import os
+import time
+import datetime
+import threading
+import humanize
+
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, as_completed, wait
+from config import load_config
+from manifest import load_manifest
+from storage import get_encoding
+from shards import ShardRecord, load_archive
+from errorlog import load_error_log
+from mypy_boto3_s3 import S3Client  # This exists purely for strong typing boto3
+from typing import Iterable, Optional, NamedTuple
+
+
+class TransferResult(NamedTuple):
+    key: str
+    size: int
+    error: Optional[str] = None
+
+class TransferTotals(NamedTuple):
+    succeeded: int
+    failed: int
+    transferred: int  # Bytes
+
+class TransferManager:
+    """
+        Moves Many Files Between data/local And The Bucket At Once
+
+        Each file is a job on a thread pool. boto3's managed transfers stream from or to
+        the file handle and switch to multipart past part_size, using the same 8 MiB
+        parts stream_file() does so multipart ETags line up with the manifest.
+    """
+    s3: S3Client
+    bucket: str
+    root: str
+    workers: int
+    config: TransferConfig
+    lock: threading.Lock
+    transferred: int  # Bytes Moved So Far, Across Every Thread
+    files: int
+    failed: int
+    start: float
+    last_report: float
+
+    def __init__(self, workers: Optional[int] = None, root: str = os.path.join("data", "local"), part_size: int = 8*1024*1024, part_concurrency: int = 4) -> None:
+        self.s3 = load_config().get_s3_client()
+        self.bucket = load_config().get_default_s3_bucket()
+        self.root = root
+        self.workers = workers if workers is not None else load_config().get_concurrency()
+        self.config = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size, max_concurrency=part_concurrency, io_chunksize=1024*1024)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.transferred = 0
+        self.files = 0
+        self.failed = 0
+        self.start = time.time()
+        self.last_report = 0
+
+    def add_bytes(self, amount: int) -> None:
+        """
+            boto3 Progress Callback, Called From Its Threads As Chunks Move
+        """
+        with self.lock:
+            self.transferred += amount
+
+    def report(self, action: str, total: Optional[int], force: bool = False) -> None:
+        now: float = time.time()
+        with self.lock:
+            if not force and now - self.last_report < 0.5:
+                return
+
+            self.last_report = now
+            transferred, files, failed = self.transferred, self.files, self.failed
+
+        elapsed: float = max(now - self.start, 0.001)
+        print("\033[K%s (%s/%s, %s Failed): %s At %s/s\tElapsed: %s" % (action, humanize.intcomma(files), humanize.intcomma(total) if total is not None else "?", humanize.intcomma(failed),
+              humanize.naturalsize(transferred), humanize.naturalsize(transferred / elapsed), humanize.naturaldelta(datetime.timedelta(seconds=elapsed))), end="\r")
+
+    def upload_packed(self, key: str) -> Optional[TransferResult]:
+        """
+            Upload A Key Whose File Was Removed After Packing Straight From Its Shard Record
+        """
+        archive = load_archive()
+        record: Optional[ShardRecord] = archive.get_record(key=key) if archive is not None else None
+        if archive is None or record is None:
+            return None
+
+        body: bytes = bytes(archive.read(record=record))
+        content_encoding: Optional[str] = get_encoding(data=body)
+
+        extra: dict = {}
+        if content_encoding is not None:
+            extra = {"ContentType": "application/json", "ContentEncoding": content_encoding}
+
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=body, **extra)
+        self.add_bytes(amount=len(body))
+        return TransferResult(key=key, size=len(body))
+
+    def upload_one(self, key: str) -> TransferResult:
+        file: str = os.path.join(self.root, key)
+
+        # Only The Magic Bytes Are Read Here, The Body Is Streamed By boto3
+        try:
+            with open(file, mode="rb") as f:
+                content_encoding: Optional[str] = get_encoding(data=f.read(4))
+        except FileNotFoundError:
+            packed: Optional[TransferResult] = self.upload_packed(key=key)
+            if packed is None:
+                raise
+
+            return packed
+
+        extra: dict = {}
+        if content_encoding is not None:
+            # Compressed Files Go Up As-Is, Tagged So HTTP Clients Decompress Them
+            extra = {"ContentType": "application/json", "ContentEncoding": content_encoding}
+
+        self.s3.upload_file(Filename=file, Bucket=self.bucket, Key=key, ExtraArgs=extra, Config=self.config, Callback=self.add_bytes)
+        return TransferResult(key=key, size=os.path.getsize(file))
+
+    def download_one(self, key: str) -> TransferResult:
+        file: str = os.path.join(self.root, key)
+        path: str = os.path.dirname(file)
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        if os.path.isdir(file):
+            return TransferResult(key=key, size=0, error="A Directory Is In The Way")
+
+        # Written Beside The Final File And Renamed, A Failed Download Never Leaves A Partial File Behind
+        temp: str = os.path.join(path, ".%s.part" % os.path.basename(file))
+        try:
+            self.s3.download_file(Bucket=self.bucket, Key=key, Filename=temp, Config=self.config, Callback=self.add_bytes)
+            os.replace(temp, file)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+            raise
+
+        # Hashed Once Now, The Next Sync Finds It Cached By mtime
+        load_manifest().get_local_hash(key=key, root=self.root)
+        return TransferResult(key=key, size=os.path.getsize(file))
+
+    def finish(self, action: str, future: Future, key: str, total: Optional[int]) -> None:
+        try:
+            result: TransferResult = future.result()
+        except Exception as e:
+            result: TransferResult = TransferResult(key=key, size=0, error="%s: %s" % (type(e).__name__, e))
+
+        with self.lock:
+            self.files += 1
+            if result.error is not None:
+                self.failed += 1
+
+        if result.error is not None:
+            load_error_log().log(url=result.key, message="%s Failed: %s" % (action, result.error), key=result.key)
+
+        self.report(action=action, total=total)
+
+    def run(self, action: str, keys: Iterable[str], download: bool, total: Optional[int] = None) -> TransferTotals:
+        """
+            Transfer Every Key, Pulling Them From keys Only As Fast As The Pool Frees Up
+
+            Pass total when keys is a generator (e.g. read from a file) so progress has something to count towards.
+            Only counts are kept, failures go to the error log, so memory doesn't grow with the number of keys.
+        """
+        if total is None and hasattr(keys, "__len__"):
+            total = len(keys) # type: ignore
+
+        self.reset()
+
+        running: dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for key in keys:
+                running[pool.submit(self.download_one if download else self.upload_one, key)] = key
+
+                # Bounded, A Huge Key List Is Never Queued Into The Pool All At Once
+                if len(running) >= self.workers*4:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.finish(action=action, future=future, key=running.pop(future), total=total)
+
+            for future in as_completed(running):
+                self.finish(action=action, future=future, key=running[future], total=total)
+
+        self.report(action=action, total=total, force=True)
+        print(end="\n")
+        load_manifest().commit()
+
+        with self.lock:
+            return TransferTotals(succeeded=self.files - self.failed, failed=self.failed, transferred=self.transferred)
+
+    def upload(self, keys: Iterable[str], total: Optional[int] = None) -> TransferTotals:
+        return self.run(action="Uploading", keys=keys, download=False, total=total)
+
+    def download(self, keys: Iterable[str], total: Optional[int] = None) -> TransferTotals:
+        return self.run(action="Downloading", keys=keys, download=True, total=total)
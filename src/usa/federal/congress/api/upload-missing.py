@@ -1,15 +1,19 @@
-import json
 import os
+import sys
 import time
+import shutil
+import argparse
 import datetime
+import tempfile
 import humanize
 
-from typing import Tuple
-from genericpath import isdir
-from botocore.paginate import PageIterator
-from mypy_boto3_s3 import S3Client, ListObjectsPaginator
-from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef
-from download import scantree, get_s3_client, get_default_s3_bucket
+from typing import Tuple, Optional, Iterable, Generator, NamedTuple
+from mypy_boto3_s3 import S3Client
+from config import load_config
+from manifest import LocalHash, load_manifest
+from bucket import BucketObject, SyncState, list_bucket, compare, is_local_newer
+from transfer import TransferManager, TransferTotals
+from keydiff import JsonArrayWriter, external_sort, read_rows, merge_join
 
 
 def get_local_bills() -> Tuple[int, set[str]]:
@@ -21,11 +25,17 @@ def get_local_bills() -> Tuple[int, set[str]]:
     if not os.path.exists(os.path.join("data", "local")):
         os.makedirs(os.path.join("data", "local"))
 
-    for file in scantree(path=os.path.join("data", "local")):
+    # Bulk Data And Hand-Copied Files Aren't Recorded By The Downloader, Pick Them Up First
+    load_manifest().reconcile()
+
+    # Every File, Not Just JSON, Or Downloaded PDFs Would Look Missing Locally
+    for key in load_manifest().keys(suffix=""):
+        if not key.startswith("usa/federal/"):
+            continue
+
         total += 1
 
-        cleaned_path: str = os.path.sep.join(file.split(os.path.sep)[2:])
-        bills.add(cleaned_path)
+        bills.add(key)
 
         if total % 1000 == 0:
             current: float = time.time()
@@ -36,114 +46,230 @@ def get_local_bills() -> Tuple[int, set[str]]:
     print("-"*40, end="\n")
     return total, bills
 
-def get_bucket_bills() -> Tuple[int, set[str]]:
+class BucketDiff(NamedTuple):
+    total: int  # Objects Listed
+    missing_from_local: set[str]
+    newer_locally: set[str]  # Differing, Local Copy Wins
+    newer_in_bucket: set[str]  # Differing, Bucket Copy Wins
+    identical: int
+
+def diff_bucket_bills(local_bills: set[str], prefix: str = "usa/federal/") -> BucketDiff:
+    """
+        Stream The Bucket Listing Against local_bills
+
+        Keys found in both are removed from local_bills as they're listed and compared by
+        size and ETag, so afterwards local_bills holds only what's missing from the bucket.
+    """
     total: int = 0
-    bills: set[str] = set()
+    identical: int = 0
+    missing_bills: set[str] = set()
+    newer_locally: set[str] = set()
+    newer_in_bucket: set[str] = set()
     start: float = time.time()
     elapsed: str = humanize.naturaldelta(0)
 
-    s3: S3Client = get_s3_client()
-    paginator: ListObjectsPaginator = s3.get_paginator('list_objects')
-    page_iterator: PageIterator = paginator.paginate(Bucket=get_default_s3_bucket(), Prefix="usa")
+    # Only usa/federal Is Listed, State And Territory Level Bills Are Never Fetched
+    s3: S3Client = load_config().get_s3_client()
+    for item in list_bucket(s3=s3, bucket=load_config().get_default_s3_bucket(), prefix=prefix, workers=load_config().get_concurrency()*2):
+        total += 1
 
-    for page in page_iterator:
-        for item in page["Contents"]:
-            total += 1
+        if item.key not in local_bills:
+            missing_bills.add(item.key)
+        else:
+            local_bills.discard(item.key)
 
-            key: str = item["Key"] # type: ignore
+            # Hashes Are Cached In The Manifest, Only New Or Modified Files Are Read
+            local: Optional[LocalHash] = load_manifest().get_local_hash(key=item.key)
+            state: SyncState = compare(local=local, remote=item, path=os.path.join("data", "local", item.key))
 
-            # Skip State and Territory Level Bills
-            if not key.startswith("usa/federal"):
-                continue
+            if state is SyncState.IDENTICAL:
+                identical += 1
+            elif state is SyncState.MISSING_FROM_LOCAL:
+                # In The Manifest But Deleted From Disk
+                missing_bills.add(item.key)
+            elif is_local_newer(local=local, remote=item): # type: ignore
+                newer_locally.add(item.key)
+            else:
+                newer_in_bucket.add(item.key)
 
-            bills.add(key)
-            # print(key)
-        
-        current: float = time.time()
-        elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(current-start)))
-        # print("-"*40, end="\n")
-        print("\033[KFiles: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
+        if total % 1000 == 0:
+            current: float = time.time()
+            elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(current-start)))
+            print("\033[KFiles: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\r")
 
     print("\033[KTotal Files: %s\tElapsed: %s" % (humanize.intcomma(total), elapsed), end="\n")
     print("-"*40, end="\n")
-    return total, bills
+    return BucketDiff(total=total, missing_from_local=missing_bills, newer_locally=newer_locally, newer_in_bucket=newer_in_bucket, identical=identical)
 
-def find_missing_entries(outer_set: set[str], inner_set: set[str]) -> set[str]:
-    missing_items: set[str] = set()
-    for outer_item in outer_set:
-        if outer_item not in inner_set:
-            missing_items.add(outer_item)
+class ExternalDiff(NamedTuple):
+    local: int  # Local Files
+    total: int  # Objects Listed
+    missing_from_bucket: int
+    missing_from_local: int
+    newer_locally: int
+    newer_in_bucket: int
+    identical: int
+    upload: str  # Key Per Line, Missing From Bucket Or Newer Locally
+    download: str  # Key Per Line, Missing From Local Or Newer In Bucket
 
-    return missing_items
+def get_local_rows() -> Generator[list, None, None]:
+    load_manifest().reconcile()
+    for key in load_manifest().keys(suffix=""):
+        if key.startswith("usa/federal/"):
+            yield [key]
 
-def download_entries(missing_bills: set[str]) -> None:
-    s3: S3Client = get_s3_client()
-    bucket: str = get_default_s3_bucket()
-    
-    count: int = 0
-    total: int = len(missing_bills)
-    for bill in missing_bills:
-        file: str = os.path.join("data", "local", bill)
-        path: str = os.path.split(file)[0]
-        count += 1
+def get_bucket_rows(prefix: str = "usa/federal/") -> Generator[list, None, None]:
+    s3: S3Client = load_config().get_s3_client()
+    for item in list_bucket(s3=s3, bucket=load_config().get_default_s3_bucket(), prefix=prefix, workers=load_config().get_concurrency()*2):
+        yield list(item)
 
-        if not os.path.exists(path):
-            os.makedirs(path)
+def read_keys(path: str) -> Generator[str, None, None]:
+    with open(path, mode="r") as f:
+        for line in f:
+            yield line.rstrip("\n")
 
-        if os.path.isdir(file):
-            continue
+def diff_external(directory: str, missing_from_bucket: str, missing_from_local: str, prefix: str = "usa/federal/", run_size: int = 500000) -> ExternalDiff:
+    """
+        Diff Local Against The Bucket Without Holding Either Side In Memory
+
+        Both listings are sorted by key into files under directory (external sort, at most
+        run_size rows in memory), then walked together. Missing keys stream straight to the
+        output JSON files, the keys to transfer go to one line per key files in directory.
+    """
+    start: float = time.time()
+
+    print("\033[KSorting Local Files...", end="\r")
+    local_path: str = external_sort(rows=get_local_rows(), directory=directory, run_size=run_size)
+
+    print("\033[KListing And Sorting Bucket...", end="\r")
+    bucket_path: str = external_sort(rows=get_bucket_rows(prefix=prefix), directory=directory, run_size=run_size)
 
-        print("\033[KDownloading Missing File (%s/%s): %s" % (humanize.intcomma(count), humanize.intcomma(total), file), end="\r")
-        with open(file=file, mode="wb") as f:
-            contents: GetObjectOutputTypeDef = s3.get_object(
-                Bucket=bucket,
-                Key=bill
-            )
-
-            f.write(contents["Body"].read())
-    # print("\n")
-
-def upload_entries(missing_bills: set[str]) -> None:
-    s3: S3Client = get_s3_client()
-    bucket: str = get_default_s3_bucket()
-
-    count: int = 0
-    total: int = len(missing_bills)
-    for bill in missing_bills:
-        file: str = os.path.join("data", "local", bill)
-
-        count += 1
-        print("\033[KUploading Missing File (%s/%s): %s" % (humanize.intcomma(count), humanize.intcomma(total), file), end="\r")
-        with open(file=file, mode="r") as f:
-            s3.put_object(
-                Bucket=bucket,
-                Body=f.read(),
-                Key=bill
-            )
-    # print("\n")
+    counts: dict[str, int] = {"local": 0, "total": 0, "newer_locally": 0, "newer_in_bucket": 0, "identical": 0}
+    missing_bucket: JsonArrayWriter = JsonArrayWriter(path=missing_from_bucket)
+    missing_local: JsonArrayWriter = JsonArrayWriter(path=missing_from_local)
+    upload_path: str = os.path.join(directory, "upload.txt")
+    download_path: str = os.path.join(directory, "download.txt")
+
+    with open(upload_path, mode="w") as upload, open(download_path, mode="w") as download:
+        for local_row, bucket_row in merge_join(left=read_rows(path=local_path), right=read_rows(path=bucket_path)):
+            counts["local"] += local_row is not None
+            counts["total"] += bucket_row is not None
+
+            if bucket_row is None:
+                missing_bucket.write(local_row[0]) # type: ignore
+                upload.write(local_row[0] + "\n") # type: ignore
+                continue
+
+            item: BucketObject = BucketObject(*bucket_row)
+            if local_row is None:
+                missing_local.write(item.key)
+                download.write(item.key + "\n")
+                continue
+
+            # Hashes Are Cached In The Manifest, Only New Or Modified Files Are Read
+            local: Optional[LocalHash] = load_manifest().get_local_hash(key=item.key)
+            state: SyncState = compare(local=local, remote=item, path=os.path.join("data", "local", item.key))
+
+            if state is SyncState.IDENTICAL:
+                counts["identical"] += 1
+            elif state is SyncState.MISSING_FROM_LOCAL:
+                # In The Manifest But Deleted From Disk
+                missing_local.write(item.key)
+                download.write(item.key + "\n")
+            elif is_local_newer(local=local, remote=item): # type: ignore
+                counts["newer_locally"] += 1
+                upload.write(item.key + "\n")
+            else:
+                counts["newer_in_bucket"] += 1
+                download.write(item.key + "\n")
+
+            if counts["total"] % 1000 == 0:
+                elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start)))
+                print("\033[KCompared: %s\tElapsed: %s" % (humanize.intcomma(counts["total"]), elapsed), end="\r")
+
+    missing_bucket.close()
+    missing_local.close()
+
+    # The Sorted Listings Can Be Huge, Only The Transfer Lists Are Still Needed
+    os.remove(local_path)
+    os.remove(bucket_path)
+
+    elapsed: str = humanize.naturaldelta(datetime.timedelta(seconds=(time.time()-start)))
+    print("\033[KTotal Files: %s\tElapsed: %s" % (humanize.intcomma(counts["total"]), elapsed), end="\n")
+    print("-"*40, end="\n")
+    return ExternalDiff(local=counts["local"], total=counts["total"], missing_from_bucket=missing_bucket.count, missing_from_local=missing_local.count,
+                        newer_locally=counts["newer_locally"], newer_in_bucket=counts["newer_in_bucket"], identical=counts["identical"], upload=upload_path, download=download_path)
+
+def download_entries(missing_bills: Iterable[str], total: Optional[int] = None) -> None:
+    totals: TransferTotals = TransferManager().download(keys=missing_bills, total=total)
+    print("Downloaded %s Files, %s Failed" % (humanize.intcomma(totals.succeeded), humanize.intcomma(totals.failed)))
+
+def upload_entries(missing_bills: Iterable[str], total: Optional[int] = None) -> None:
+    totals: TransferTotals = TransferManager().upload(keys=missing_bills, total=total)
+    print("Uploaded %s Files, %s Failed" % (humanize.intcomma(totals.succeeded), humanize.intcomma(totals.failed)))
 
 if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Sync data/local With The Bucket, Both Ways")
+    parser.add_argument("--external", action="store_true", help="Diff Through Sorted Temp Files Instead Of In-Memory Sets, Memory Stays Flat However Big The Corpus Is")
+    parser.add_argument("--temp-dir", type=str, default=None, help="Where --external Writes Its Sorted Listings (Defaults To The System Temp Directory)")
+    parser.add_argument("--run-size", type=int, default=500000, help="Keys Sorted In Memory At Once With --external")
+    parser.add_argument("--missing-from-bucket", type=str, default=os.path.join("data", "missing-from-bucket.json"))
+    parser.add_argument("--missing-from-local", type=str, default=os.path.join("data", "missing-from-local.json"))
+    args: argparse.Namespace = parser.parse_args()
+
+    if args.external:
+        directory: str = tempfile.mkdtemp(prefix="upload-missing-", dir=args.temp_dir)
+        try:
+            external: ExternalDiff = diff_external(directory=directory, missing_from_bucket=args.missing_from_bucket, missing_from_local=args.missing_from_local, run_size=args.run_size)
+
+            print("-"*40)
+            print("Total Local: %s, Total Bucket: %s" % (humanize.intcomma(external.local), humanize.intcomma(external.total)))
+            print("Total Missing From Bucket: %s" % humanize.intcomma(external.missing_from_bucket))
+            print("Total Missing From Local: %s" % humanize.intcomma(external.missing_from_local))
+            print("Total Differing: %s (%s Newer Locally, %s Newer In Bucket)" % (humanize.intcomma(external.newer_locally+external.newer_in_bucket), humanize.intcomma(external.newer_locally), humanize.intcomma(external.newer_in_bucket)))
+            print("Total Identical: %s" % humanize.intcomma(external.identical))
+            print("-"*40)
+            print("Saved Items Missing From Bucket To %s" % args.missing_from_bucket)
+            print("Saved Items Missing From Local To %s" % args.missing_from_local)
+
+            # Keys Are Read Back From Disk As The Pool Takes Them
+            upload_entries(missing_bills=read_keys(path=external.upload), total=external.missing_from_bucket+external.newer_locally)
+            download_entries(missing_bills=read_keys(path=external.download), total=external.missing_from_local+external.newer_in_bucket)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        print("Done...")
+        sys.exit(0)
+
     local_count, local_bills = get_local_bills()
-    bucket_count, bucket_bills = get_bucket_bills()
 
-    missing_bills_in_bucket: set = find_missing_entries(outer_set=local_bills, inner_set=bucket_bills)
-    missing_bills_in_local: set = find_missing_entries(outer_set=bucket_bills, inner_set=local_bills)
+    # Only One Full Set, What's Left Of local_bills Afterwards Is Missing From The Bucket
+    diff: BucketDiff = diff_bucket_bills(local_bills=local_bills)
+    missing_bills_in_bucket: set = local_bills
+    missing_bills_in_local: set = diff.missing_from_local
 
     print("-"*40)
-    print("Total Local: %s, Total Bucket: %s" % (humanize.intcomma(local_count), humanize.intcomma(bucket_count)))
+    print("Total Local: %s, Total Bucket: %s" % (humanize.intcomma(local_count), humanize.intcomma(diff.total)))
     print("Total Missing From Bucket: %s" % humanize.intcomma(len(missing_bills_in_bucket)))
     print("Total Missing From Local: %s" % humanize.intcomma(len(missing_bills_in_local)))
+    print("Total Differing: %s (%s Newer Locally, %s Newer In Bucket)" % (humanize.intcomma(len(diff.newer_locally)+len(diff.newer_in_bucket)), humanize.intcomma(len(diff.newer_locally)), humanize.intcomma(len(diff.newer_in_bucket))))
+    print("Total Identical: %s" % humanize.intcomma(diff.identical))
 
     print("-"*40)
     print("Saving Items Missing From Bucket...")
-    with open(file="/home/alexis/Desktop/missing-from-bucket.json", mode="w") as f:
-        f.write(json.dumps(list(missing_bills_in_bucket)))
+    writer: JsonArrayWriter = JsonArrayWriter(path=args.missing_from_bucket)
+    for key in missing_bills_in_bucket:
+        writer.write(key)
+    writer.close()
 
     print("Saving Items Missing From Local...")
-    with open(file="/home/alexis/Desktop/missing-from-local.json", mode="w") as f:
-        f.write(json.dumps(list(missing_bills_in_local)))
+    writer: JsonArrayWriter = JsonArrayWriter(path=args.missing_from_local)
+    for key in missing_bills_in_local:
+        writer.write(key)
+    writer.close()
 
-    upload_entries(missing_bills=missing_bills_in_bucket)
-    download_entries(missing_bills=missing_bills_in_local)
+    # Only Keys That Are Missing Or Differ Move, The Newer Side Of A Differing Key Wins
+    upload_entries(missing_bills=missing_bills_in_bucket | diff.newer_locally)
+    download_entries(missing_bills=missing_bills_in_local | diff.newer_in_bucket)
 
-    print("Done...")
\ No newline at end of file
+    print("Done...")
@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+
+from typing import Union, NamedTuple, Optional, Generator
+
+
+class FileEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+
+def scan_directory(path: str, suffix: str) -> tuple[list[str], list[FileEntry]]:
+    """
+        One scandir() Call, Split Into Subdirectories And Matching Files
+    """
+    directories: list[str] = []
+    files: list[FileEntry] = []
+
+    try:
+        iterator = os.scandir(path=path)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return directories, files
+
+    with iterator:
+        for entry in iterator:
+            # d_type From The Directory Listing Answers This Without A stat() Call
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif entry.name.endswith(suffix):
+                try:
+                    stat: os.stat_result = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue  # Renamed Or Removed Since The Listing (e.g. A .part File Being Finished)
+
+                files.append(FileEntry(path=entry.path, size=stat.st_size, mtime=stat.st_mtime))
+
+    return directories, files
+
+def walk_serial(path: str, suffix: str) -> Generator[FileEntry, None, None]:
+    stack: list[str] = [path]
+    while len(stack) > 0:
+        directories, files = scan_directory(path=stack.pop(), suffix=suffix)
+        stack.extend(reversed(directories))
+        yield from files
+
+def walk(path: str = os.path.join("data", "local"), suffix: str = ".json", workers: int = 8) -> Generator[FileEntry, None, None]:
+    """
+        Walk A Directory Tree With A Thread Pool, Yielding Every File Ending In suffix
+
+        Threads share one LIFO stack of directories, so the walk stays depth first and
+        the stack never grows much past the tree's depth times its fan-out.
+    """
+    if workers <= 1:
+        yield from walk_serial(path=path, suffix=suffix)
+        return
+
+    directories: queue.LifoQueue = queue.LifoQueue()
+    results: queue.Queue = queue.Queue(maxsize=workers*64)
+    lock: threading.Lock = threading.Lock()
+    stopped: threading.Event = threading.Event()
+    pending: list[int] = [1]  # Directories Queued Or Being Scanned
+
+    def worker() -> None:
+        while not stopped.is_set():
+            directory: Optional[str] = directories.get()
+            if directory is None:
+                break
+
+            try:
+                found_directories, files = scan_directory(path=directory, suffix=suffix)
+                with lock:
+                    pending[0] += len(found_directories)
+
+                for found in found_directories:
+                    directories.put(found)
+
+                if len(files) > 0:
+                    results.put(files)
+            except Exception as e:
+                # Raised In The Consumer, Like bucket.list_bucket() Does
+                results.put(e)
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    finished: bool = pending[0] == 0
+
+            if finished:
+                # Wake Every Worker So They Can Exit, Then Tell The Consumer
+                for _ in range(workers):
+                    directories.put(None)
+                results.put(None)
+
+    directories.put(path)
+    threads: list[threading.Thread] = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            batch: Optional[Union[list[FileEntry], Exception]] = results.get()
+            if batch is None:
+                break
+
+            if isinstance(batch, Exception):
+                raise batch
+
+            yield from batch
+    finally:
+        # Consumer Stopped Early, Unblock Any Worker Waiting On A Full Results Queue
+        stopped.set()
+        for _ in range(workers):
+            directories.put(None)
+        while any(thread.is_alive() for thread in threads):
+            try:
+                results.get_nowait()
+            except queue.Empty:
+                pass
+
+            for thread in threads:
+                thread.join(timeout=0.01)
@@ -1,82 +1,323 @@
 import os
 import json
+import time
+import sqlite3
+import argparse
+import datetime
+import threading
 import requests
 
-from typing import Any
-from requests import Response
-from io import TextIOWrapper, BufferedWriter
+from typing import Any, Optional, NamedTuple
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
 
 
 base_url: str = "https://www.govinfo.gov/bulkdata/json"
+root: str = "data/local/usa/federal/congress/bulk"
 
 headers: dict = {
 	"Accept": "application/json"
 }
 
+class BulkItem(NamedTuple):
+	url: str
+	path: str  # Relative To root, e.g. BILLSTATUS/108/s/BILLSTATUS-108s603.xml
+	folder: bool
+	size: Optional[int]  # From The Parent Listing, None For Folders Or When It's Not Given
+	modified: Optional[float]
+	attempts: int
+
+class BulkFrontier:
+	"""
+		Crawl State Kept In data/bulk.db, So A Restart Picks Up Where The Last Run Stopped
+
+		Every folder and file seen in a listing is a row. done=0 rows are the frontier,
+		done=1 rows were visited. Rows handed to a worker are only tracked in memory, so
+		anything in flight when the crawl was killed is simply taken again next time.
+	"""
+	path: str
+	lock: threading.RLock
+	connection: sqlite3.Connection
+	leased: set[str]
+	pending_writes: int
+
+	def __init__(self, path: str = os.path.join("data", "bulk.db")) -> None:
+		self.path = path
+		self.lock = threading.RLock()
+		self.leased = set()
+		self.pending_writes = 0
+
+		directory: str = os.path.dirname(path)
+		if directory != "" and not os.path.exists(directory):
+			os.makedirs(directory)
+
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA synchronous=NORMAL")
+		self.connection.execute("CREATE TABLE IF NOT EXISTS items (url TEXT PRIMARY KEY, path TEXT NOT NULL, folder INTEGER NOT NULL, size INTEGER, modified REAL, done INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, error TEXT)")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS items_frontier ON items (done, folder)")
+		self.connection.commit()
+
+	def seed(self, url: str) -> None:
+		with self.lock:
+			self.connection.execute("INSERT OR IGNORE INTO items (url, path, folder) VALUES (?, '', 1)", (url,))
+			self.connection.commit()
+
+	def refresh(self) -> int:
+		"""
+			Queue Every Folder To Be Listed Again And Everything Given Up On To Be Tried Again
+
+			Files already on disk are still skipped by size and date.
+		"""
+		with self.lock:
+			cursor: sqlite3.Cursor = self.connection.execute("UPDATE items SET done = 0, attempts = 0 WHERE folder = 1 OR done = -1")
+			self.connection.commit()
+			return cursor.rowcount
+
+	def add(self, items: list[BulkItem]) -> None:
+		with self.lock:
+			# A Re-Listed Folder Updates Size And Date, So Changed Files (And Ones Given Up On) Are Fetched Again
+			self.connection.executemany("INSERT INTO items (url, path, folder, size, modified) VALUES (?, ?, ?, ?, ?) "
+										"ON CONFLICT (url) DO UPDATE SET done = CASE WHEN done != -1 AND size IS excluded.size AND modified IS excluded.modified THEN done ELSE 0 END, "
+										"attempts = CASE WHEN done = -1 THEN 0 ELSE attempts END, size = excluded.size, modified = excluded.modified",
+										[(item.url, item.path, int(item.folder), item.size, item.modified) for item in items])
+			self.wrote(len(items))
+
+	def take(self, limit: int) -> list[BulkItem]:
+		"""
+			Lease Up To limit Frontier Rows, Listings First So The Frontier Keeps Growing While Files Download
+		"""
+		with self.lock:
+			rows: list = self.connection.execute("SELECT url, path, folder, size, modified, attempts FROM items WHERE done = 0 ORDER BY folder DESC, rowid LIMIT ?", (limit + len(self.leased),)).fetchall()
+
+			items: list[BulkItem] = []
+			for url, path, folder, size, modified, attempts in rows:
+				if url in self.leased:
+					continue
+
+				self.leased.add(url)
+				items.append(BulkItem(url=url, path=path, folder=bool(folder), size=size, modified=modified, attempts=attempts))
+				if len(items) >= limit:
+					break
+
+			return items
+
+	def finish(self, item: BulkItem) -> None:
+		with self.lock:
+			self.connection.execute("UPDATE items SET done = 1, error = NULL WHERE url = ?", (item.url,))
+			self.leased.discard(item.url)
+			self.wrote(1)
+
+	def fail(self, item: BulkItem, error: str, max_attempts: int) -> None:
+		with self.lock:
+			# done=-1 Gives Up On It, Until The Next --refresh Or A Re-Listing Of Its Folder
+			self.connection.execute("UPDATE items SET attempts = attempts + 1, error = ?, done = CASE WHEN attempts + 1 >= ? THEN -1 ELSE 0 END WHERE url = ?", (error, max_attempts, item.url))
+			self.leased.discard(item.url)
+			self.wrote(1)
+
+	def wrote(self, count: int) -> None:
+		self.pending_writes += count
+		if self.pending_writes >= 1000:
+			self.commit()
+
+	def commit(self) -> None:
+		with self.lock:
+			self.connection.commit()
+			self.pending_writes = 0
+
+	def count(self, done: int) -> int:
+		with self.lock:
+			return self.connection.execute("SELECT COUNT(*) FROM items WHERE done = ?", (done,)).fetchone()[0]
+
+	def close(self) -> None:
+		with self.lock:
+			self.connection.commit()
+			self.connection.close()
+
+def get_session(workers: int) -> Session:
+	"""
+		One Keep-Alive Session Shared By Every Worker, With A Connection For Each Of Them
+	"""
+	session: Session = requests.Session()
+	adapter: HTTPAdapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+	return session
+
+def get_size(section: dict) -> Optional[int]:
+	size: Any = section.get("fileSize")
+	if size is None or section.get("folder") == True:
+		return None
+
+	try:
+		return int(size)
+	except (TypeError, ValueError):
+		return None
+
+def get_modified(section: dict) -> Optional[float]:
+	"""
+		Listing Timestamps Come Back In A Few Shapes, Anything Unrecognized Is Treated As Unknown
+	"""
+	modified: Any = section.get("lastModifiedTime")
+	if isinstance(modified, (int, float)):
+		# Milliseconds Since The Epoch
+		return modified / 1000 if modified > 1e11 else float(modified)
+
+	modified = section.get("formattedLastModifiedTime")
+	if not isinstance(modified, str) or modified.strip() == "":
+		return None
+
+	for pattern in ["%d-%b-%Y %H:%M", "%b %d, %Y %I:%M %p", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %I:%M %p"]:
+		try:
+			return datetime.datetime.strptime(modified.strip(), pattern).replace(tzinfo=datetime.timezone.utc).timestamp()
+		except ValueError:
+			continue
+
+	return None
+
 def save_local(key: str, body: str) -> None:
 	path: str = os.path.dirname(key)
 	if not os.path.exists(path):
-		os.makedirs(path)
-	
-	file: TextIOWrapper = open(key, 'w')
-	file.write(body)
-	file.close()
-
-def save_file_local(key: str, body: bytes) -> None:
-	print("Saving File: %s" % key)
-	
-	path: str = os.path.dirname(key)
-	if not os.path.exists(path):
-		os.makedirs(path)
-	
-	file: BufferedWriter = open(key, 'wb')
-	file.write(body)
-	file.close()
-
-noskipagain = True
-def crawl_bulk_download(url: str) -> None:
-	global noskipagain
-	
-	response: Response = requests.get(url=url, headers=headers)
+		os.makedirs(path, exist_ok=True)
+
+	with open(key, 'w') as file:
+		file.write(body)
+
+def is_current(file: str, item: BulkItem) -> bool:
+	"""
+		Whether The File On Disk Already Matches The Size And Date The Listing Reports
+	"""
+	if item.size is None or not os.path.exists(file):
+		return False
+
+	stat: os.stat_result = os.stat(file)
+	if stat.st_size != item.size:
+		return False
+
+	# Downloads Are Stamped With The Listing's Date, So A Match Means Nothing Changed Upstream
+	return item.modified is None or abs(stat.st_mtime - item.modified) < 1
+
+def list_folder(session: Session, item: BulkItem) -> list[BulkItem]:
+	response: Response = session.get(url=item.url, headers=headers, timeout=60)
+	response.raise_for_status()
 	results: Any = response.json()
-	
-	skip = False
+
+	children: list[BulkItem] = []
 	for section in results["files"]:
-		# Temporary Resume Solution
-		# TODO: If continuing this script, clean it up
-		# /bulkdata/BILLSTATUS/108/s/BILLSTATUS-108s603.xml
-		# if section["justFileName"] == "BILLSTATUS":
-		# 	#print("Step 1")
-		# 	skip = False
-		# elif section["justFileName"] == "108":
-		# 	#print("Step 2")
-		# 	skip = False
-		# elif section["justFileName"] == "s":
-		# 	#print("Step 3 - %s" % noskipagain)
-		# 	#noskipagain = True
-		# 	skip = False
-		# elif section["justFileName"] == "BILLSTATUS-108s603.xml":
-		# 	#print("Step 4")
-		# 	noskipagain = True
-		# 	skip = False
-		# else:
-		# 	if not noskipagain:
-		# 		#print("Step 4 - %s/%s" % (skip, noskipagain))
-		# 		skip = True
-		
-		if skip and not noskipagain:
-			#print("No Skip Again - %s - %s" % (noskipagain, section["justFileName"]))
-			continue
-		
+		path: str = section["justFileName"] if item.path == "" else "%s/%s" % (item.path, section["justFileName"])
+
 		if section["folder"] == True:
-			file_path: str = "data/local/usa/federal/congress/bulk/%s/%s/data.json" % ("/".join(url.split("/")[5:]), section["justFileName"])
-			save_local(key=file_path, body=json.dumps(section))
-			
-			crawl_bulk_download(url=section["link"])
-		else:
-			file_path: str = "data/local/usa/federal/congress/bulk/%s/%s" % ("/".join(url.split("/")[5:]), section["justFileName"])
-			response = requests.get(url=section["link"])
-			save_file_local(key=file_path, body=response.content)
+			save_local(key="%s/%s/data.json" % (root, path), body=json.dumps(section))
+
+		children.append(BulkItem(url=section["link"], path=path, folder=section["folder"] == True, size=get_size(section=section), modified=get_modified(section=section), attempts=0))
+
+	return children
+
+def download_file(session: Session, item: BulkItem) -> bool:
+	"""
+		Stream A File To Disk, Returns False When The Local Copy Was Already Current
+	"""
+	file: str = "%s/%s" % (root, item.path)
+	if is_current(file=file, item=item):
+		return False
+
+	path: str = os.path.dirname(file)
+	if not os.path.exists(path):
+		os.makedirs(path, exist_ok=True)
+
+	# Written Beside The Final File And Renamed, So An Interrupted Download Never Looks Complete
+	temp: str = "%s.part" % file
+	try:
+		with session.get(url=item.url, stream=True, timeout=60) as response:
+			response.raise_for_status()
+			with open(temp, 'wb') as f:
+				for chunk in response.iter_content(chunk_size=1024*1024):
+					f.write(chunk)
+
+		if item.modified is not None:
+			os.utime(temp, (item.modified, item.modified))
+
+		os.replace(temp, file)
+	except BaseException:
+		if os.path.exists(temp):
+			os.remove(temp)
+
+		raise
+
+	return True
+
+def process(session: Session, frontier: BulkFrontier, item: BulkItem) -> tuple[int, bool]:
+	"""
+		Returns The Number Of Items Discovered And Whether Anything Was Downloaded
+	"""
+	if item.folder:
+		children: list[BulkItem] = list_folder(session=session, item=item)
+		frontier.add(items=children)
+		return len(children), False
+
+	return 0, download_file(session=session, item=item)
+
+def crawl_bulk_download(url: str = base_url, workers: int = 8, database: str = os.path.join("data", "bulk.db"), refresh: bool = False, max_attempts: int = 3) -> None:
+	frontier: BulkFrontier = BulkFrontier(path=database)
+	frontier.seed(url=url)
+	if refresh:
+		print("Listing %s Folders Again" % frontier.refresh())
+
+	session: Session = get_session(workers=workers)
+	start: float = time.time()
+	downloaded: int = 0
+	skipped: int = 0
+	listed: int = 0
+	failed: int = 0
+
+	running: dict[Future, BulkItem] = {}
+	try:
+		with ThreadPoolExecutor(max_workers=workers) as pool:
+			while True:
+				# Keep A Couple Of Jobs Per Worker Queued, The Rest Of The Frontier Stays In The Database
+				if len(running) < workers*2:
+					for item in frontier.take(limit=workers*2 - len(running)):
+						running[pool.submit(process, session, frontier, item)] = item
+
+				if len(running) == 0:
+					break
+
+				done, _ = wait(running, return_when=FIRST_COMPLETED)
+				for future in done:
+					item: BulkItem = running.pop(future)
+					try:
+						_, fetched = future.result()
+					except Exception as e:
+						failed += 1
+						print("\033[KFailed %s: %s" % (item.url, e))
+						frontier.fail(item=item, error="%s: %s" % (type(e).__name__, e), max_attempts=max_attempts)
+						continue
+
+					frontier.finish(item=item)
+					if item.folder:
+						listed += 1
+					elif fetched:
+						downloaded += 1
+					else:
+						skipped += 1
+
+				elapsed: str = str(datetime.timedelta(seconds=int(time.time()-start)))
+				print("\033[KListed: %s, Downloaded: %s, Skipped: %s, Failed: %s\tElapsed: %s" % (listed, downloaded, skipped, failed, elapsed), end="\r")
+	finally:
+		# Whatever Finished Is Kept, Leased Rows Are Still done=0 And Get Taken Again Next Run
+		frontier.close()
+		session.close()
+
+	print(end="\n")
+	print("Done... Listed %s Folders, Downloaded %s Files, Skipped %s Current Files, %s Failed" % (listed, downloaded, skipped, failed))
 
 if __name__ == "__main__":
-	crawl_bulk_download(url=base_url)
\ No newline at end of file
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Mirror The govinfo Bulk Data Repository Into data/local")
+	parser.add_argument("-w", "--workers", type=int, default=8, help="Concurrent Listings And Downloads")
+	parser.add_argument("--database", type=str, default=os.path.join("data", "bulk.db"), help="Where The Frontier And Visited Set Are Kept")
+	parser.add_argument("--refresh", action="store_true", help="List Every Folder Again To Pick Up New And Changed Files")
+	parser.add_argument("--max-attempts", type=int, default=3)
+	args: argparse.Namespace = parser.parse_args()
+
+	crawl_bulk_download(url=base_url, workers=args.workers, database=args.database, refresh=args.refresh, max_attempts=args.max_attempts)